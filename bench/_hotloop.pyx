@@ -0,0 +1,15 @@
+# Compiled versions of the per-key loops used by the benchmark scripts, so the
+# timings are not dominated by interpreter overhead. These are built on demand
+# by pyximport; see _runner.py for the pure-Python fallbacks.
+
+
+def for_each(fn, list keys):
+    cdef Py_ssize_t i
+    for i in range(len(keys)):
+        fn(keys[i])
+
+
+def for_each_pair(fn, list keys, list values):
+    cdef Py_ssize_t i
+    for i in range(len(keys)):
+        fn(keys[i], values[i])
@@ -0,0 +1,136 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Each benchmark script declares a list of cases and a list of operations, and
+hands them to :py:func:`run_suite`. The runner generates the key/value corpus
+for each case once, then times every operation against it.
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import contextlib
+import time
+try:
+    import pyximport
+except ImportError:
+    pyximport = None
+
+
+# An operation to benchmark. The callable is invoked as fn(db, keys, values,
+# chunksize). When "parallel" is set, the corpus is split across worker
+# threads if a concurrency level was requested. Operations with "threads" set
+# always use that many worker threads, regardless of the requested level.
+# Operations with "max_nrows" set are skipped for larger cases.
+Op = namedtuple('Op', ('name', 'fn', 'parallel', 'max_nrows', 'threads'))
+Op.__new__.__defaults__ = (True, None, None)
+
+
+def for_each(fn, keys):
+    for key in keys:
+        fn(key)
+
+
+def for_each_pair(fn, keys, values):
+    for key, value in zip(keys, values):
+        fn(key, value)
+
+
+# Use the compiled loops from _hotloop.pyx when Cython is available.
+if pyximport is not None:
+    pyximport.install(language_level=3)
+    try:
+        from _hotloop import for_each
+        from _hotloop import for_each_pair
+    except ImportError:
+        pass
+
+
+def parse_args(description=None):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('-c', '--concurrency', default=1, type=int,
+                        help='number of threads to split each operation '
+                             'across (default=1)')
+    return parser.parse_args()
+
+
+def make_corpus(nrows, kprefix, klen, vlen):
+    kfmt = '%s%%0%sd' % (kprefix, klen)
+    vfmt = '%%0%sd' % vlen
+    return [kfmt % i for i in range(nrows)], [vfmt % i for i in range(nrows)]
+
+
+@contextlib.contextmanager
+def timed(msg, *params):
+    pstr = ', '.join(map(str, params))
+    s = time.perf_counter_ns()
+    yield
+    # Report whole seconds and milliseconds using integer arithmetic.
+    ms = (time.perf_counter_ns() - s) // 1000000
+    print('%d.%03ds - %s(%s)' % (ms // 1000, ms % 1000, msg, pstr))
+
+
+def _run_in_thread(db, fn, keys, values, chunksize):
+    try:
+        fn(db, keys, values, chunksize)
+    finally:
+        db._protocol.close()
+
+
+def dispatch(db, op, keys, values, chunksize, concurrency=1):
+    if op.threads is not None:
+        concurrency = op.threads
+    if concurrency <= 1 or not op.parallel:
+        return op.fn(db, keys, values, chunksize)
+
+    # Each worker thread gets its own connection and a contiguous slice of the
+    # corpus, so requests from different threads overlap on the server.
+    step = (len(keys) + concurrency - 1) // concurrency
+    with ThreadPoolExecutor(concurrency) as executor:
+        futures = [executor.submit(_run_in_thread, db, op.fn,
+                                   keys[i:i + step], values[i:i + step],
+                                   chunksize)
+                   for i in range(0, len(keys), step)]
+        for future in futures:
+            future.result()
+
+
+def _clear(db, reset=None):
+    # Restarting an in-memory server is cheaper than clearing a large db.
+    if reset is not None:
+        return reset()
+    db.clear()
+    return db
+
+
+def run_suite(db, cases, ops, concurrency=1, setup=None, clear_after=False,
+              reset=None):
+    """
+    Run every operation against every case.
+
+    :param db: client to benchmark.
+    :param cases: list of (nrows, chunksize, kprefix, ksiz, vsiz) tuples.
+    :param ops: list of :py:class:`Op` to run, in order.
+    :param int concurrency: number of threads to split each operation across.
+    :param setup: optional callable invoked as setup(db, keys, values,
+        chunksize) before the operations for each case are run.
+    :param bool clear_after: clear the database after every operation.
+    :param reset: optional callable returning a client connected to a fresh,
+        empty database, used instead of clearing the database.
+    """
+    for nrows, chunksize, kprefix, ksiz, vsiz in cases:
+        # Generate the keys and values up-front, so the timings measure the
+        # cost of the protocol rather than the cost of string formatting.
+        keys, values = make_corpus(nrows, kprefix, ksiz, vsiz)
+        if setup is not None:
+            setup(db, keys, values, chunksize)
+
+        for op in ops:
+            if op.max_nrows is not None and nrows > op.max_nrows:
+                continue
+            with timed(op.name, nrows, chunksize, ksiz, vsiz):
+                dispatch(db, op, keys, values, chunksize, concurrency)
+            if clear_after:
+                db = _clear(db, reset)
+
+        db = _clear(db, reset)
+        print('\n')
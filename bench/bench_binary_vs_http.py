@@ -7,89 +7,91 @@ binary protocol and HTTP protocol.
 import os, sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-import contextlib
-import time
-
-from kt import *
-
-
-server = EmbeddedServer(quiet=True)
-server.run()
-db = server.client
-
-
-def do_set_bulk(nrows, chunksize, klen, vlen):
-    kfmt = '%%0%sd' % klen
-    vfmt = '%%0%sd' % vlen
-    for i in range(0, nrows, chunksize):
-        accum = {kfmt % j: vfmt % j for j in range(i, i + chunksize)}
-        db.set_bulk(accum)
-
-def do_set_bulk_http(nrows, chunksize, klen, vlen):
-    kfmt = '%%0%sd' % klen
-    vfmt = '%%0%sd' % vlen
-    for i in range(0, nrows, chunksize):
-        accum = {kfmt % j: vfmt % j for j in range(i, i + chunksize)}
-        db._http.set_bulk(accum)
-
-def do_get_bulk(nrows, chunksize, klen, vlen):
-    kfmt = '%%0%sd' % klen
-    for i in range(0, nrows, chunksize):
-        accum = [kfmt % j for j in range(i, i + chunksize)]
-        db.get_bulk(accum)
-
-def do_get_bulk_http(nrows, chunksize, klen, vlen):
-    kfmt = '%%0%sd' % klen
-    for i in range(0, nrows, chunksize):
-        accum = [kfmt % j for j in range(i, i + chunksize)]
-        db._http.get_bulk(accum)
-
-def do_remove_bulk(nrows, chunksize, klen, vlen):
-    kfmt = '%%0%sd' % klen
-    for i in range(0, nrows, chunksize):
-        accum = [kfmt % j for j in range(i, i + chunksize)]
-        db.remove_bulk(accum)
-
-def do_remove_bulk_http(nrows, chunksize, klen, vlen):
-    kfmt = '%%0%sd' % klen
-    for i in range(0, nrows, chunksize):
-        accum = [kfmt % j for j in range(i, i + chunksize)]
-        db._http.remove_bulk(accum)
-
-@contextlib.contextmanager
-def timed(msg, *params):
-    pstr = ', '.join(map(str, params))
-    s = time.time()
-    yield
-    print('%0.3fs - %s(%s)' % (time.time() - s, msg, pstr))
+from kt import EmbeddedServer
 
+from _runner import Op
+from _runner import parse_args
+from _runner import run_suite
+
+
+def do_set_bulk(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        db.set_bulk(dict(zip(keys[i:i + chunksize], values[i:i + chunksize])))
+
+def do_set_bulk_pipeline(db, keys, values, chunksize):
+    # Several batches are written to the socket with a single send, and their
+    # responses are read back together.
+    with db.pipeline(PIPELINE_DEPTH) as pipe:
+        for i in range(0, len(keys), chunksize):
+            pipe.set_bulk(dict(zip(keys[i:i + chunksize],
+                                   values[i:i + chunksize])))
+
+def do_set_bulk_http(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        db._http.set_bulk(dict(zip(keys[i:i + chunksize],
+                                   values[i:i + chunksize])))
+
+def do_get_bulk(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        db.get_bulk(keys[i:i + chunksize])
+
+def do_get_bulk_pipeline(db, keys, values, chunksize):
+    with db.pipeline(PIPELINE_DEPTH) as pipe:
+        for i in range(0, len(keys), chunksize):
+            pipe.get_bulk(keys[i:i + chunksize])
+
+def do_get_bulk_http(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        db._http.get_bulk(keys[i:i + chunksize])
+
+def do_remove_bulk(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        db.remove_bulk(keys[i:i + chunksize])
+
+def do_remove_bulk_pipeline(db, keys, values, chunksize):
+    with db.pipeline(PIPELINE_DEPTH) as pipe:
+        for i in range(0, len(keys), chunksize):
+            pipe.remove_bulk(keys[i:i + chunksize])
+
+def do_remove_bulk_http(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        db._http.remove_bulk(keys[i:i + chunksize])
+
+
+# Number of bulk requests to queue before sending them to the server.
+PIPELINE_DEPTH = 4
 
 SETTINGS = (
-    # (nrows, chunksiz, ksiz, vsiz).
-    (200000, 10000, 48, 512),  # ~100MB of data, 20 batches.
-    (25000, 1250, 256, 1024 * 4),  # ~100MB of data, 20 batches.
-    (1700, 100, 256, 1024 * 64),  # ~100MB of data, 17 batches.
+    # (nrows, chunksiz, kprefix, ksiz, vsiz).
+    (200000, 10000, '', 48, 512),  # ~100MB of data, 20 batches.
+    (25000, 1250, '', 256, 1024 * 4),  # ~100MB of data, 20 batches.
+    (1700, 100, '', 256, 1024 * 64),  # ~100MB of data, 17 batches.
+)
+
+OPS = (
+    Op('set_bulk', do_set_bulk),
+    Op('get_bulk', do_get_bulk),
+    Op('remove_bulk', do_remove_bulk),
+    Op('set_bulk_pipeline', do_set_bulk_pipeline),
+    Op('get_bulk_pipeline', do_get_bulk_pipeline),
+    Op('remove_bulk_pipeline', do_remove_bulk_pipeline),
+    # Concurrent HTTP requests each use their own pooled connection.
+    Op('set_bulk_http', do_set_bulk_http),
+    Op('get_bulk_http', do_get_bulk_http),
+    Op('remove_bulk_http', do_remove_bulk_http),
 )
-for nrows, chunksiz, ksiz, vsiz in SETTINGS:
-    with timed('set_bulk', nrows, chunksiz, ksiz, vsiz):
-        do_set_bulk(nrows, chunksiz, ksiz, vsiz)
-    with timed('get_bulk', nrows, chunksiz, ksiz, vsiz):
-        do_get_bulk(nrows, chunksiz, ksiz, vsiz)
-    with timed('remove_bulk', nrows, chunksiz, ksiz, vsiz):
-        do_remove_bulk(nrows, chunksiz, ksiz, vsiz)
-
-    db.clear()
-    with timed('set_bulk_http', nrows, chunksiz, ksiz, vsiz):
-        do_set_bulk_http(nrows, chunksiz, ksiz, vsiz)
-    with timed('get_bulk_http', nrows, chunksiz, ksiz, vsiz):
-        do_get_bulk_http(nrows, chunksiz, ksiz, vsiz)
-    with timed('remove_bulk_http', nrows, chunksiz, ksiz, vsiz):
-        do_remove_bulk_http(nrows, chunksiz, ksiz, vsiz)
-    db.clear()
-    print('\n')
-
-try:
-    server.stop()
-except OSError:
-    pass
 
+
+if __name__ == '__main__':
+    args = parse_args(__doc__)
+
+    server = EmbeddedServer(quiet=True)
+    server.run()
+
+    run_suite(server.client, SETTINGS, OPS, args.concurrency,
+              reset=server.reset)
+
+    try:
+        server.stop()
+    except OSError:
+        pass
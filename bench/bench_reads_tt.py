@@ -7,70 +7,62 @@ different methods.
 import os, sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-import contextlib
-import time
+from kt import EmbeddedTokyoTyrantServer
 
-from kt import *
+from _runner import Op
+from _runner import for_each
+from _runner import parse_args
+from _runner import run_suite
 
 
-# In-memory btree.
-server = EmbeddedTokyoTyrantServer(database='+', quiet=True)
-server.run()
-db = server.client
+def load_data(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        db.set_bulk(dict(zip(keys[i:i + chunksize], values[i:i + chunksize])))
 
+    mbsize = db.size / (1024. * 1024.)
+    print('database initialized, size: %.fMB, %s records' % (mbsize, len(db)))
 
-def do_get(nrows, kprefix, klen):
-    kfmt = '%s%%0%sd' % (kprefix, klen)
-    for i in range(nrows):
-        db.get(kfmt % i)
+def do_get(db, keys, values, chunksize):
+    for_each(db.get, keys)
 
-def do_get_bulk(nrows, chunksize, kprefix, klen):
-    kfmt = '%s%%0%sd' % (kprefix, klen)
-    for i in range(0, nrows, chunksize):
-        keys = [kfmt % j for j in range(i, i + chunksize)]
-        db.get_bulk(keys)
+def do_get_bulk(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        db.get_bulk(keys[i:i + chunksize])
 
-def do_get_range(nrows, chunksize, kprefix, klen):
-    kfmt = '%s%%0%sd' % (kprefix, klen)
-    for i in range(0, nrows, chunksize):
-        start = kfmt % i
-        stop = kfmt % (i + chunksize)
+def do_get_range(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        start = keys[i]
+        stop = keys[i + chunksize] if i + chunksize < len(keys) else None
         db.get_range(start, stop, max_keys=chunksize)
 
-def do_match_prefix(nrows, chunksize, kprefix, klen):
-    kfmt = '%s%%0%sd' % (kprefix, klen)
-    for i in range(0, nrows, chunksize):
-        prefix = (kfmt % i)[:-(len(str(chunksize)) - 1)]
+def do_match_prefix(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        prefix = keys[i][:-(len(str(chunksize)) - 1)]
         db.match_prefix(prefix, chunksize)
 
-def do_match_regex(nrows, chunksize, kprefix, klen):
-    kfmt = '%s%%0%sd' % (kprefix, klen)
-    for i in range(0, nrows, chunksize):
-        regex = (kfmt % i)[:-(len(str(chunksize)) - 1)]
+def do_match_prefix_scan(db, keys, values, chunksize):
+    # Fetch every matching key with a single request. The keys are
+    # zero-padded, so the first and last keys share the longest prefix.
+    db.match_prefix(os.path.commonprefix([keys[0], keys[-1]]))
+
+def do_match_regex(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        regex = keys[i][:-(len(str(chunksize)) - 1)]
         db.match_regex(regex + '*', chunksize)
 
-def do_iter_from(kprefix, klen):
-    kfmt = '%s%%0%sd' % (kprefix, klen)
-    for _ in db.iter_from(kfmt % 0):
+def do_iter_from(db, keys, values, chunksize):
+    for _ in db.iter_from(keys[0]):
         pass
 
-def do_keys():
+def do_keys(db, keys, values, chunksize):
     for _ in db.keys():
         pass
 
-def do_items():
+def do_items(db, keys, values, chunksize):
     for _ in db.items():
         pass
 
 
-@contextlib.contextmanager
-def timed(msg, *params):
-    pstr = ', '.join(map(str, params))
-    s = time.time()
-    yield
-    print('%0.3fs - %s(%s)' % (time.time() - s, msg, pstr))
-
-
 SETTINGS = (
     # (nrows, chunksiz, kprefix, ksiz, vsiz).
     (100000, 10000, 'a', 48, 512),
@@ -78,46 +70,32 @@ SETTINGS = (
     (1700, 100, 'c', 256, 1024 * 64),
 )
 
-# Setup database.
-
-for nrows, chunksiz, kprefix, ksiz, vsiz in SETTINGS:
-    for i in range(0, nrows, chunksiz):
-        kfmt = '%s%%0%sd' % (kprefix, ksiz)
-        vfmt = '%%0%sd' % (vsiz)
-        accum = {kfmt % j: vfmt % j for j in range(i, i + chunksiz)}
-        db.set_bulk(accum)
-
-    mbsize = db.size / (1024. * 1024.)
-    print('database initialized, size: %.fMB, %s records' % (mbsize, len(db)))
-
-    with timed('get', nrows, kprefix, ksiz):
-        do_get(nrows, kprefix, ksiz)
-
-    with timed('get_bulk', nrows, chunksiz, kprefix, ksiz):
-        do_get_bulk(nrows, chunksiz, kprefix, ksiz)
-
-    with timed('get_range', nrows, chunksiz, kprefix, ksiz):
-        do_get_range(nrows, chunksiz, kprefix, ksiz)
-
-    with timed('match_prefix', nrows, chunksiz, kprefix, ksiz):
-        do_match_prefix(nrows, chunksiz, kprefix, ksiz)
-
-    with timed('match_regex', nrows, chunksiz, kprefix, ksiz):
-        do_match_regex(nrows, chunksiz, kprefix, ksiz)
+OPS = (
+    Op('get', do_get),
+    Op('get_bulk', do_get_bulk),
+    Op('get_range', do_get_range),
+    Op('match_prefix', do_match_prefix),
+    # A single request for the whole corpus, so it is not split across threads.
+    Op('match_prefix (scan)', do_match_prefix_scan, parallel=False),
+    Op('match_regex', do_match_regex),
+    # Iterating the whole database is not split across threads.
+    Op('iter_from', do_iter_from, parallel=False),
+    Op('keys', do_keys, parallel=False),
+    Op('items', do_items, parallel=False),
+)
 
-    with timed('iter_from', kprefix, ksiz):
-        do_iter_from(kprefix, ksiz)
 
-    with timed('keys'):
-        do_keys()
+if __name__ == '__main__':
+    args = parse_args(__doc__)
 
-    with timed('items'):
-        do_items()
+    # In-memory btree.
+    server = EmbeddedTokyoTyrantServer(database='+', quiet=True)
+    server.run()
 
-    print('\n')
-    db.clear()
+    run_suite(server.client, SETTINGS, OPS, args.concurrency,
+              setup=load_data, reset=server.reset)
 
-try:
-    server.stop()
-except OSError:
-    pass
+    try:
+        server.stop()
+    except OSError:
+        pass
@@ -7,78 +7,63 @@ different methods (set, set_bulk, set via http, set_bulk via http).
 import os, sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-import contextlib
-import time
+from kt import EmbeddedServer
 
-from kt import *
+from _runner import Op
+from _runner import for_each_pair
+from _runner import parse_args
+from _runner import run_suite
 
 
-server = EmbeddedServer(quiet=True)
-server.run()
-db = server.client
+def do_set(db, keys, values, chunksize):
+    for_each_pair(db.set, keys, values)
 
+def do_set_bulk(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        db.set_bulk(dict(zip(keys[i:i + chunksize], values[i:i + chunksize])))
 
-def do_set(nrows, klen, vlen):
-    kfmt = '%%0%sd' % klen
-    vfmt = '%%0%sd' % vlen
-    for i in range(nrows):
-        db.set(kfmt % i, vfmt % i)
+def do_set_pipeline(db, keys, values, chunksize):
+    with db.pipeline(chunksize) as pipe:
+        for key, value in zip(keys, values):
+            pipe.set(key, value)
 
-def do_set_bulk(nrows, chunksize, klen, vlen):
-    kfmt = '%%0%sd' % klen
-    vfmt = '%%0%sd' % vlen
-    for i in range(0, nrows, chunksize):
-        accum = {kfmt % j: vfmt % j for j in range(i, i + chunksize)}
-        db.set_bulk(accum)
+def do_set_http(db, keys, values, chunksize):
+    for key, value in zip(keys, values):
+        db._http.set(key, value)
 
-def do_set_http(nrows, klen, vlen):
-    kfmt = '%%0%sd' % klen
-    vfmt = '%%0%sd' % vlen
-    for i in range(nrows):
-        db._http.set(kfmt % i, vfmt % i)
-
-def do_set_bulk_http(nrows, chunksize, klen, vlen):
-    kfmt = '%%0%sd' % klen
-    vfmt = '%%0%sd' % vlen
-    for i in range(0, nrows, chunksize):
-        accum = {kfmt % j: vfmt % j for j in range(i, i + chunksize)}
-        db._http.set_bulk(accum)
-
-@contextlib.contextmanager
-def timed(msg, *params):
-    pstr = ', '.join(map(str, params))
-    s = time.time()
-    yield
-    print('%0.3fs - %s(%s)' % (time.time() - s, msg, pstr))
+def do_set_bulk_http(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        db._http.set_bulk(dict(zip(keys[i:i + chunksize],
+                                   values[i:i + chunksize])))
 
 
 SETTINGS = (
-    # (nrows, chunksiz, ksiz, vsiz).
-    (200000, 10000, 48, 512),  # ~100MB of data, 20 batches.
-    (25000, 1250, 256, 1024 * 4),  # ~100MB of data, 20 batches.
-    (1700, 100, 256, 1024 * 64),  # ~100MB of data, 17 batches.
+    # (nrows, chunksiz, kprefix, ksiz, vsiz).
+    (200000, 10000, '', 48, 512),  # ~100MB of data, 20 batches.
+    (25000, 1250, '', 256, 1024 * 4),  # ~100MB of data, 20 batches.
+    (1700, 100, '', 256, 1024 * 64),  # ~100MB of data, 17 batches.
 )
-for nrows, chunksiz, ksiz, vsiz in SETTINGS:
-    with timed('set', nrows, ksiz, vsiz):
-        do_set(nrows, ksiz, vsiz)
-    db.clear()
 
+OPS = (
+    Op('set', do_set),
     # Lots of small requests is incredibly slow, so avoid pointless benchmark.
-    if nrows < 25000:
-        with timed('set_http', nrows, ksiz, vsiz):
-            do_set_http(nrows, ksiz, vsiz)
-        db.clear()
-
-    with timed('set_bulk', nrows, chunksiz, ksiz, vsiz):
-        do_set_bulk(nrows, chunksiz, ksiz, vsiz)
-    db.clear()
-
-    with timed('set_bulk_http', nrows, chunksiz, ksiz, vsiz):
-        do_set_bulk_http(nrows, chunksiz, ksiz, vsiz)
-    db.clear()
-    print('\n')
-
-try:
-    server.stop()
-except OSError:
-    pass
+    Op('set_http', do_set_http, parallel=False, max_nrows=24999),
+    Op('set_pipeline', do_set_pipeline),
+    Op('set_bulk', do_set_bulk),
+    Op('set_bulk_http', do_set_bulk_http, parallel=False),
+)
+
+
+if __name__ == '__main__':
+    args = parse_args(__doc__)
+
+    server = EmbeddedServer(quiet=True)
+    server.run()
+
+    run_suite(server.client, SETTINGS, OPS, args.concurrency,
+              clear_after=True, reset=server.reset)
+
+    try:
+        server.stop()
+    except OSError:
+        pass
@@ -4,79 +4,59 @@
 Benchmark script to measure time taken to set values using a variety of
 different methods (set, set_bulk, setnr, setnr_bulk).
 """
+import functools
 import os, sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-import contextlib
-import time
+from kt import EmbeddedTokyoTyrantServer
 
-from kt import *
+from _runner import Op
+from _runner import for_each_pair
+from _runner import parse_args
+from _runner import run_suite
 
 
-server = EmbeddedTokyoTyrantServer(quiet=True)
-server.run()
-db = server.client
+def do_set(db, keys, values, chunksize):
+    for_each_pair(db.set, keys, values)
 
+def do_set_bulk(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        db.set_bulk(dict(zip(keys[i:i + chunksize], values[i:i + chunksize])))
 
-def do_set(nrows, klen, vlen):
-    kfmt = '%%0%sd' % klen
-    vfmt = '%%0%sd' % vlen
-    for i in range(nrows):
-        db.set(kfmt % i, vfmt % i)
+def do_setnr(db, keys, values, chunksize):
+    for_each_pair(functools.partial(db.set, no_reply=True), keys, values)
 
-def do_set_bulk(nrows, chunksize, klen, vlen):
-    kfmt = '%%0%sd' % klen
-    vfmt = '%%0%sd' % vlen
-    for i in range(0, nrows, chunksize):
-        accum = {kfmt % j: vfmt % j for j in range(i, i + chunksize)}
-        db.set_bulk(accum)
+def do_setnr_bulk(db, keys, values, chunksize):
+    for i in range(0, len(keys), chunksize):
+        db.set_bulk(dict(zip(keys[i:i + chunksize], values[i:i + chunksize])),
+                    no_reply=True)
 
-def do_setnr(nrows, klen, vlen):
-    kfmt = '%%0%sd' % klen
-    vfmt = '%%0%sd' % vlen
-    for i in range(nrows):
-        db.set(kfmt % i, vfmt % i, no_reply=True)
 
-def do_setnr_bulk(nrows, chunksize, klen, vlen):
-    kfmt = '%%0%sd' % klen
-    vfmt = '%%0%sd' % vlen
-    for i in range(0, nrows, chunksize):
-        accum = {kfmt % j: vfmt % j for j in range(i, i + chunksize)}
-        db.set_bulk(accum, no_reply=True)
+SETTINGS = (
+    # (nrows, chunksiz, kprefix, ksiz, vsiz).
+    (200000, 10000, '', 48, 512),  # ~100MB of data, 20 batches.
+    (25000, 1250, '', 256, 1024 * 4),  # ~100MB of data, 20 batches.
+    (1700, 100, '', 256, 1024 * 64),  # ~100MB of data, 17 batches.
+)
 
-@contextlib.contextmanager
-def timed(msg, *params):
-    pstr = ', '.join(map(str, params))
-    s = time.time()
-    yield
-    print('%0.3fs - %s(%s)' % (time.time() - s, msg, pstr))
+OPS = (
+    Op('set', do_set),
+    Op('setnr', do_setnr),
+    Op('set_bulk', do_set_bulk),
+    Op('setnr_bulk', do_setnr_bulk),
+)
 
 
-SETTINGS = (
-    # (nrows, chunksiz, ksiz, vsiz).
-    (200000, 10000, 48, 512),  # ~100MB of data, 20 batches.
-    (25000, 1250, 256, 1024 * 4),  # ~100MB of data, 20 batches.
-    (1700, 100, 256, 1024 * 64),  # ~100MB of data, 17 batches.
-)
-for nrows, chunksiz, ksiz, vsiz in SETTINGS:
-    with timed('set', nrows, ksiz, vsiz):
-        do_set(nrows, ksiz, vsiz)
-    db.clear()
-
-    with timed('setnr', nrows, ksiz, vsiz):
-        do_setnr(nrows, ksiz, vsiz)
-    db.clear()
-
-    with timed('set_bulk', nrows, chunksiz, ksiz, vsiz):
-        do_set_bulk(nrows, chunksiz, ksiz, vsiz)
-    db.clear()
-
-    with timed('setnr_bulk', nrows, chunksiz, ksiz, vsiz):
-        do_setnr_bulk(nrows, chunksiz, ksiz, vsiz)
-    db.clear()
-    print('\n')
-
-try:
-    server.stop()
-except OSError:
-    pass
+if __name__ == '__main__':
+    args = parse_args(__doc__)
+
+    server = EmbeddedTokyoTyrantServer(quiet=True)
+    server.run()
+
+    run_suite(server.client, SETTINGS, OPS, args.concurrency,
+              clear_after=True, reset=server.reset)
+
+    try:
+        server.stop()
+    except OSError:
+        pass
@@ -13,7 +13,15 @@ import os
 import sys
 import time
 
-from kt import *
+from kt import EmbeddedTokyoTyrantServer
+
+
+def report(total, limit, suffix=''):
+    # Write the whole result with a single call, bypassing stdout buffering.
+    status = '1;31mFAIL' if total >= limit else '1;32mOK'
+    sys.stdout.flush()
+    os.write(1, ('\x1b[%s! \nTOTAL TIME: %0.3fs\x1b[0m\n%s' %
+                 (status, total, suffix)).encode('utf8'))
 
 
 nsec = 1
@@ -32,32 +40,31 @@ server = EmbeddedTokyoTyrantServer(server_args=['-ext', script,
                                    connection_pool=True)
 server.run()
 
-tt = server._create_client()
+# All green threads share the server's pooled client, so sockets are checked
+# out of the pool rather than opened per-greenlet.
+tt = server.client
 
 def call_slow_script(nsec):
     tt.script('sleep', key=str(nsec))
     tt.status()
+    tt.close()
 
 threads = []
-start = time.time()
+start = time.perf_counter()
 for i in range(nthreads):
     threads.append(gevent.spawn(call_slow_script, nsec))
 
 for t in threads:
     t.join()
 
-tt._protocol.close_all()
-
-total = time.time() - start
-if total >= (nsec * nthreads):
-    print('\x1b[1;31mFAIL! ')
-else:
-    print('\x1b[1;32mOK! ')
-print('TOTAL TIME: %0.3fs\x1b[0m\n' % total)
+report(time.perf_counter() - start, nsec * nthreads, '\n')
 
 # Now run a whole shitload of connections.
 nconns = nthreads * 16
 
+# With a connection pool, close() checks the connection back in to the pool
+# rather than closing it, so the greenlets reuse the connections that were
+# opened during the first phase.
 def check_status_sleep(nsec):
     tt.status()
     tt.close()
@@ -69,18 +76,14 @@ print('\x1b[1;33m%s green threads checking status' % (nconns))
 print('\x1b[0m')
 
 threads = []
-start = time.time()
+start = time.perf_counter()
 for i in range(nconns):
     threads.append(gevent.spawn(check_status_sleep, nsec))
 
 for t in threads:
     t.join()
 
-total = time.time() - start
-if total >= (nsec * nthreads):
-    print('\x1b[1;31mFAIL! ')
-else:
-    print('\x1b[1;32mOK! ')
-print('TOTAL TIME: %0.3fs\x1b[0m' % total)
+report(time.perf_counter() - start, nsec * nthreads)
 
+tt._protocol.close_all()
 server.stop()
@@ -14,5 +14,27 @@ from .embedded import EmbeddedTokyoTyrantServer
 from .exceptions import ImproperlyConfigured
 from .exceptions import KyotoTycoonError
 from .exceptions import ProtocolError
+from .exceptions import ScriptError
 from .exceptions import ServerConnectionError
 from .exceptions import ServerError
+
+
+__all__ = (
+    'EmbeddedServer',
+    'EmbeddedTokyoTyrantServer',
+    'ImproperlyConfigured',
+    'KT_BINARY',
+    'KT_JSON',
+    'KT_MSGPACK',
+    'KT_NONE',
+    'KT_PICKLE',
+    'KyotoTycoon',
+    'KyotoTycoonError',
+    'ProtocolError',
+    'QueryBuilder',
+    'ScriptError',
+    'ServerConnectionError',
+    'ServerError',
+    'TT_TABLE',
+    'TokyoTyrant',
+)
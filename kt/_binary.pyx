@@ -1,19 +1,24 @@
 cimport cython
+from cpython.bytearray cimport PyByteArray_AS_STRING
+from cpython.bytearray cimport PyByteArray_Resize
+from cpython.bytes cimport PyBytes_AS_STRING
 from cpython.bytes cimport PyBytes_AsStringAndSize
 from cpython.bytes cimport PyBytes_Check
+from cpython.bytes cimport PyBytes_FromStringAndSize
 from cpython.unicode cimport PyUnicode_AsUTF8String
 from cpython.unicode cimport PyUnicode_Check
 from cpython.unicode cimport PyUnicode_DecodeUTF8
 from cpython.version cimport PY_MAJOR_VERSION
 from libc.stdint cimport int32_t
 from libc.stdint cimport int64_t
+from libc.stdint cimport uint16_t
 from libc.stdint cimport uint32_t
 from libc.stdint cimport uint64_t
 from libc.stdlib cimport free
 from libc.stdlib cimport malloc
 from libc.string cimport memcpy
+from libc.string cimport memmove
 
-import heapq
 import io
 import math
 import socket
@@ -59,6 +64,48 @@ cdef inline bytes _encode(obj):
         result = bytes(obj)
     return result
 
+cdef inline void _pack_be(unsigned char *buf, uint64_t num, int n):
+    # Write the low n bytes of num to buf, most-significant byte first.
+    while n > 0:
+        n -= 1
+        buf[n] = <unsigned char>(num & 0xff)
+        num >>= 8
+
+cdef inline uint64_t _unpack_be(const unsigned char *buf, int n):
+    # Read an n-byte integer from buf, most-significant byte first.
+    cdef:
+        uint64_t num = 0
+        int i
+    for i in range(n):
+        num = (num << 8) | buf[i]
+    return num
+
+cdef inline bytes _pack_db_key(uint16_t db, bytes bkey):
+    # Record header (db, klen) followed by the key, as a single object, which
+    # is cheaper than struct.pack() plus two separate buffer writes.
+    cdef:
+        Py_ssize_t klen = len(bkey)
+        bytes result = PyBytes_FromStringAndSize(NULL, 6 + klen)
+        unsigned char *buf = <unsigned char *>PyBytes_AS_STRING(result)
+    _pack_be(buf, db, 2)
+    _pack_be(buf + 2, klen, 4)
+    memcpy(buf + 6, PyBytes_AS_STRING(bkey), klen)
+    return result
+
+cdef inline bytes _pack_db_key_vlen_xt(uint16_t db, bytes bkey, uint32_t vlen,
+                                       int64_t xt):
+    # Record header (db, klen, vlen, xt) followed by the key.
+    cdef:
+        Py_ssize_t klen = len(bkey)
+        bytes result = PyBytes_FromStringAndSize(NULL, 18 + klen)
+        unsigned char *buf = <unsigned char *>PyBytes_AS_STRING(result)
+    _pack_be(buf, db, 2)
+    _pack_be(buf + 2, klen, 4)
+    _pack_be(buf + 6, vlen, 4)
+    _pack_be(buf + 10, <uint64_t>xt, 8)
+    memcpy(buf + 18, PyBytes_AS_STRING(bkey), klen)
+    return result
+
 cdef inline unicode _decode(obj):
     cdef:
         unicode result
@@ -85,44 +132,76 @@ def decode(obj):
 
 cdef int READSIZE = 64 * 1024
 
+# Receive buffers that grew past this size to hold a large response are
+# shrunk back down once the response has been consumed.
+cdef int MAX_RECVBUF = 1024 * 1024
+
+# Values at least this large are not copied into the request buffer, but are
+# handed to sendmsg() as separate parts of a scatter/gather write.
+cdef int LARGE_VALUE = 16 * 1024
+
+# Maximum number of buffers to pass to a single sendmsg() call.
+cdef int IOV_MAX = 1024
+
+cdef bint HAS_SENDMSG = hasattr(socket.socket, 'sendmsg')
+
 
 cdef class _Socket(object):
     cdef:
-        bytearray recvbuf
-        int bytes_read
-        int bytes_written
+        # Data is received directly into "buf". The unread portion lies
+        # between the bytes_read and bytes_written offsets.
+        bytearray buf
+        Py_ssize_t bytes_read
+        Py_ssize_t bytes_written
         readonly bint is_closed
-        buf
         _socket
 
     def __init__(self, s):
         self._socket = s
         self.is_closed = False
-        self.buf = io.BytesIO()
+        self.buf = bytearray(READSIZE)
         self.bytes_read = self.bytes_written = 0
-        self.recvbuf = bytearray(READSIZE)
 
     def __dealloc__(self):
         if not self.is_closed:
-            if self.buf is not None:
-                self.buf.close()
             self._socket.close()
 
-    cdef _read_from_socket(self, int length):
+    cdef _reserve(self, Py_ssize_t length):
+        # Ensure there is room for "length" more bytes after the unread data,
+        # first by moving the unread data to the front of the buffer, and
+        # failing that, by growing the buffer.
+        cdef:
+            char *ptr = PyByteArray_AS_STRING(self.buf)
+            Py_ssize_t unread = self.bytes_written - self.bytes_read
+
+        if self.bytes_written + length <= len(self.buf):
+            return
+
+        if self.bytes_read > 0:
+            memmove(ptr, ptr + self.bytes_read, unread)
+            self.bytes_read = 0
+            self.bytes_written = unread
+
+        if unread + length > len(self.buf):
+            PyByteArray_Resize(self.buf, max(unread + length,
+                                             2 * len(self.buf)))
+
+    cdef _read_from_socket(self, Py_ssize_t length):
         cdef:
-            int l = 0
-            int marker = 0
+            Py_ssize_t l = 0
+            Py_ssize_t marker = 0
 
-        recvptr = memoryview(self.recvbuf)
-        self.buf.seek(self.bytes_written)
+        self._reserve(max(length, READSIZE))
+        recvptr = memoryview(self.buf)
 
         try:
             while True:
-                l = self._socket.recv_into(recvptr, READSIZE)
+                l = self._socket.recv_into(recvptr[self.bytes_written:])
                 if not l:
+                    # Release the buffer export before close() discards it.
+                    recvptr = None
                     self.close()
                     raise ServerConnectionError('server went away')
-                self.buf.write(recvptr[:l])
                 self.bytes_written += l
                 marker += l
                 if length > 0 and length > marker:
@@ -133,22 +212,47 @@ cdef class _Socket(object):
         except socket.error:
             raise ServerConnectionError('error while reading from socket')
 
-    cdef recv(self, int length):
+    cdef recv(self, Py_ssize_t length):
         cdef:
             bytes data
-            int buflen = self.bytes_written - self.bytes_read
+            Py_ssize_t buflen = self.bytes_written - self.bytes_read
 
         if length > buflen:
             self._read_from_socket(length - buflen)
 
-        self.buf.seek(self.bytes_read)
-        data = self.buf.read(length)
+        data = PyBytes_FromStringAndSize(
+            PyByteArray_AS_STRING(self.buf) + self.bytes_read, length)
         self.bytes_read += length
 
         if self.bytes_read == self.bytes_written:
             self.purge()
         return data
 
+    cdef const unsigned char *read_ptr(self, Py_ssize_t length) except NULL:
+        # Mark the next "length" bytes as read and return a pointer to them,
+        # avoiding a bytes object for fixed-size fields. The pointer is only
+        # valid until the next read.
+        cdef:
+            char *ptr
+            Py_ssize_t buflen = self.bytes_written - self.bytes_read
+
+        if length > buflen:
+            self._read_from_socket(length - buflen)
+
+        ptr = PyByteArray_AS_STRING(self.buf) + self.bytes_read
+        self.bytes_read += length
+        return <const unsigned char *>ptr
+
+    cdef skip(self, Py_ssize_t length):
+        cdef Py_ssize_t buflen = self.bytes_written - self.bytes_read
+
+        if length > buflen:
+            self._read_from_socket(length - buflen)
+
+        self.bytes_read += length
+        if self.bytes_read == self.bytes_written:
+            self.purge()
+
     cdef send(self, bytes data):
         try:
             self._socket.sendall(data)
@@ -156,10 +260,34 @@ cdef class _Socket(object):
             self.close()
             raise ServerConnectionError('server went away')
 
+    cdef sendmsg(self, list parts):
+        cdef:
+            Py_ssize_t n
+            Py_ssize_t offset = 0
+
+        if not HAS_SENDMSG:
+            return self.send(b''.join(parts))
+
+        parts = [memoryview(part) for part in parts]
+        try:
+            while offset < len(parts):
+                n = self._socket.sendmsg(parts[offset:offset + IOV_MAX])
+
+                # Skip past the parts that were written completely, and trim
+                # the one that was only partially written, if any.
+                while offset < len(parts) and n >= len(parts[offset]):
+                    n -= len(parts[offset])
+                    offset += 1
+                if n > 0:
+                    parts[offset] = parts[offset][n:]
+        except IOError:
+            self.close()
+            raise ServerConnectionError('server went away')
+
     cdef purge(self):
-        self.buf.seek(0)
-        self.buf.truncate()
         self.bytes_read = self.bytes_written = 0
+        if self.buf is not None and len(self.buf) > MAX_RECVBUF:
+            PyByteArray_Resize(self.buf, READSIZE)
 
     cdef bint close(self):
         if self.is_closed:
@@ -172,8 +300,8 @@ cdef class _Socket(object):
             pass
         self._socket.close()
 
-        self.purge()
-        self.buf.close()
+        # Drop the buffer rather than shrinking it in purge().
+        self.bytes_read = self.bytes_written = 0
         self.buf = None
         return True
 
@@ -220,8 +348,11 @@ cdef class SocketPool(object):
                 else:
                     return sock
 
+            # Free sockets are ordered by the time they were checked in, so
+            # the most recently used socket is reused first. If it is too old,
+            # every other free socket is as well.
             while self.free:
-                ts, sock = heapq.heappop(self.free)
+                ts, sock = self.free.pop()
                 if ts > threshold:
                     self.in_use[tid] = sock
                     return sock
@@ -240,7 +371,7 @@ cdef class SocketPool(object):
         if tid in self.in_use:
             sock = self.in_use.pop(tid)
             if not sock.is_closed:
-                heapq.heappush(self.free, (time.time(), sock))
+                self.free.append((time.time(), sock))
 
     cdef close(self):
         cdef:
@@ -253,18 +384,19 @@ cdef class SocketPool(object):
 
     cdef int close_idle(self, cutoff=60):
         cdef:
-            float now = time.time()
-            float ts
+            double now = time.time()
+            double ts
             int n = 0
             _Socket sock
 
         with self.mutex:
+            # The least recently used sockets are at the front of the list.
             while self.free:
-                ts, sock = heapq.heappop(self.free)
+                ts, sock = self.free[0]
                 if ts > (now - cutoff):
-                    heapq.heappush(self.free, (ts, sock))
                     break
                 else:
+                    del self.free[0]
                     n += 1
 
         return n
@@ -290,14 +422,12 @@ cdef class SocketPool(object):
 
 
 struct_h = struct.Struct('>H')
-struct_hi = struct.Struct('>HI')
 struct_i = struct.Struct('>I')
 struct_ii = struct.Struct('>II')
 struct_iii = struct.Struct('>III')
 struct_l = struct.Struct('>q')
 struct_q = struct.Struct('>Q')
 struct_qq = struct.Struct('>QQ')
-struct_dbkvxt = struct.Struct('>HIIq')
 
 
 @cython.freelist(32)
@@ -305,12 +435,14 @@ cdef class RequestBuffer(object):
     cdef:
         object value_encode
         public object buf
+        list parts
         _Socket _socket
 
     def __init__(self, _Socket socket, value_encode=None):
         self._socket = socket
         self.value_encode = value_encode
         self.buf = io.BytesIO()
+        self.parts = []
 
     cdef RequestBuffer write_magic(self, magic):
         self.buf.write(magic)
@@ -344,14 +476,23 @@ cdef class RequestBuffer(object):
         self.buf.write(data)
         return self
 
+    cdef RequestBuffer write_value(self, bytes bval):
+        # Large values are kept as-is instead of being copied into the buffer.
+        if len(bval) < LARGE_VALUE:
+            self.buf.write(bval)
+        else:
+            self.parts.append(self.buf.getvalue())
+            self.parts.append(bval)
+            self.buf = io.BytesIO()
+        return self
+
     cdef RequestBuffer write_key_list_with_db(self, keys, db):
         # [k0, k1, k2], db
         cdef bytes bkey
         self.write_int(len(keys))
         for key in keys:
             bkey = _encode(key)
-            self.buf.write(struct_hi.pack(db, len(bkey)))
-            self.buf.write(bkey)
+            self.buf.write(_pack_db_key(db, bkey))
         return self
 
     cdef RequestBuffer write_db_key_list(self, data):
@@ -360,25 +501,49 @@ cdef class RequestBuffer(object):
         self.write_int(len(data))
         for db, key in data:
             bkey = _encode(key)
-            self.buf.write(struct_hi.pack(db, len(bkey)))
-            self.buf.write(bkey)
+            self.buf.write(_pack_db_key(db, bkey))
         return self
 
     cdef RequestBuffer write_key_value_list_with_db_expire(self, data, db, xt,
                                                            encode_values):
-        # [(k0, v0), (k1, v1)...], db, xt
+        # {k0: v0, k1: v1...}, db, xt
+        return self.write_key_value_pairs_with_db_expire(
+            len(data), data.items(), db, xt, encode_values)
+
+    cdef RequestBuffer write_key_value_pairs_with_db_expire(self, n, pairs, db,
+                                                            xt, encode_values):
+        # n, iter([(k0, v0), (k1, v1)...]), db, xt
         cdef bytes bkey, bval
 
-        self.buf.write(struct_i.pack(len(data)))
-        for key, value in data.items():
+        # The default serializer is the same as _encode(), so call it directly
+        # rather than through a Python-level function call per value.
+        if encode_values and self.value_encode is encode:
+            encode_values = False
+
+        self.buf.write(struct_i.pack(n))
+        for key, value in pairs:
             bkey = _encode(key)
             if encode_values:
                 bval = self.value_encode(value)
             else:
                 bval = _encode(value)
-            self.buf.write(struct_dbkvxt.pack(db, len(bkey), len(bval), xt))
-            self.buf.write(bkey)
-            self.buf.write(bval)
+            self.buf.write(_pack_db_key_vlen_xt(db, bkey, len(bval), xt))
+            self.write_value(bval)
+        return self
+
+    cdef RequestBuffer write_key_value_with_db_expire(self, key, value, db,
+                                                      xt, encode_value):
+        # k0, v0, db, xt -- written as a list containing a single item.
+        cdef bytes bkey = _encode(key)
+        cdef bytes bval
+
+        if encode_value:
+            bval = self.value_encode(value)
+        else:
+            bval = _encode(value)
+        self.buf.write(struct_i.pack(1))
+        self.buf.write(_pack_db_key_vlen_xt(db, bkey, len(bval), xt))
+        self.write_value(bval)
         return self
 
     cdef RequestBuffer write_db_key_value_expire_list(self, data,
@@ -386,6 +551,9 @@ cdef class RequestBuffer(object):
         # [(db0, k0, v0, xt0), (db1, k1, v1, xt1)...]
         cdef bytes bkey, bval
 
+        if encode_values and self.value_encode is encode:
+            encode_values = False
+
         self.buf.write(struct_i.pack(len(data)))
         for db, key, value, xt in data:
             bkey = _encode(key)
@@ -395,9 +563,8 @@ cdef class RequestBuffer(object):
                 bval = _encode(value)
             if xt is None:
                 xt = EXPIRE
-            self.buf.write(struct_dbkvxt.pack(db, len(bkey), len(bval), xt))
-            self.buf.write(bkey)
-            self.buf.write(bval)
+            self.buf.write(_pack_db_key_vlen_xt(db, bkey, len(bval), xt))
+            self.write_value(bval)
         return self
 
     cdef RequestBuffer write_key(self, key):
@@ -427,14 +594,19 @@ cdef class RequestBuffer(object):
 
         self.buf.write(struct_ii.pack(len(bkey), len(bval)))
         self.buf.write(bkey)
-        self.buf.write(bval)
+        self.write_value(bval)
         return self
 
     cdef send_simple(self, data):
         self._socket.send(data)
 
     cdef send(self):
-        self._socket.send(self.buf.getvalue())
+        if self.parts:
+            self.parts.append(self.buf.getvalue())
+            self._socket.sendmsg(self.parts)
+            self.parts = []
+        else:
+            self._socket.send(self.buf.getvalue())
         self.buf = io.BytesIO()
 
 
@@ -459,9 +631,17 @@ cdef class BaseResponseHandler(object):
         return value
 
     cdef inline int32_t read_int(self):
-        cdef bytes bdata = self._socket.recv(4)
-        cdef unsigned char *data = <unsigned char *>bdata
-        return (data[0]<<24) + (data[1]<<16) + (data[2]<<8) + data[3]
+        return <int32_t>_unpack_be(self._socket.read_ptr(4), 4)
+
+    cdef inline int read_record_header(self, uint16_t *db, uint32_t *klen,
+                                       uint32_t *vlen, int64_t *xt) except -1:
+        # Read a (db, klen, vlen, xt) record header.
+        cdef const unsigned char *buf = self._socket.read_ptr(18)
+        db[0] = <uint16_t>_unpack_be(buf, 2)
+        klen[0] = <uint32_t>_unpack_be(buf + 2, 4)
+        vlen[0] = <uint32_t>_unpack_be(buf + 6, 4)
+        xt[0] = <int64_t>_unpack_be(buf + 10, 8)
+        return 0
 
     cdef inline int64_t read_long(self):
         return struct_q.unpack(self._socket.recv(8))[0]
@@ -536,12 +716,15 @@ cdef class BaseResponseHandler(object):
 
     cdef list read_keys_values_with_db_expire(self, decode_values):
         cdef:
-            int i, klen, vlen, n_items
+            int i, n_items
+            uint16_t db
+            uint32_t klen, vlen
+            int64_t xt
             list accum = []
 
         n_items = self.read_int()
         for i in range(n_items):
-            db, klen, vlen, xt = struct_dbkvxt.unpack(self._socket.recv(18))
+            self.read_record_header(&db, &klen, &vlen, &xt)
             key = self._socket.recv(klen)
             value = self._socket.recv(vlen)
             if self._decode_keys:
@@ -552,15 +735,35 @@ cdef class BaseResponseHandler(object):
 
         return accum
 
+    cdef read_single_value(self, decode_value):
+        # Read the response to a request for a single key, discarding all
+        # but the value. Returns None if the key was not found.
+        cdef:
+            uint16_t db
+            uint32_t klen, vlen
+            int64_t xt
+
+        if self.read_int() == 0:
+            return
+
+        self.read_record_header(&db, &klen, &vlen, &xt)
+        self._socket.skip(klen)
+        value = self._socket.recv(vlen)
+        if decode_value:
+            value = self.value_decode(value)
+        return value
+
     cdef dict read_keys_values_with_db_expire_dict(self, decode_values):
         cdef:
-            int klen, vlen
+            uint16_t db
+            uint32_t klen, vlen
+            int64_t xt
             dict accum = {}
             int i, n_items
 
         n_items = self.read_int()
         for i in range(n_items):
-            _, klen, vlen, _ = struct_dbkvxt.unpack(self._socket.recv(18))
+            self.read_record_header(&db, &klen, &vlen, &xt)
             key = self._socket.recv(klen)
             value = self._socket.recv(vlen)
             if self._decode_keys:
@@ -735,11 +938,7 @@ cdef class KTBinaryProtocol(BinaryProtocol):
             self._decode_keys,
             self.decode_value)
 
-    cdef KTResponseHandler _get_bulk(self, keys, db, flat):
-        cdef:
-            RequestBuffer request = self.request()
-            KTResponseHandler response
-
+    cdef _write_get_bulk(self, RequestBuffer request, keys, db, flat):
         if db is None:
             db = self.default_db
 
@@ -748,6 +947,13 @@ cdef class KTBinaryProtocol(BinaryProtocol):
             request.write_key_list_with_db(keys, db)
         else:
             request.write_db_key_list(keys)
+
+    cdef KTResponseHandler _get_bulk(self, keys, db, flat):
+        cdef:
+            RequestBuffer request = self.request()
+            KTResponseHandler response
+
+        self._write_get_bulk(request, keys, db, flat)
         request.send()
 
         response = self.response()
@@ -811,16 +1017,12 @@ cdef class KTBinaryProtocol(BinaryProtocol):
         :param bint decode_value: deserialize values after reading
         :return: value or None if not found
         """
-        result = self.get_bulk_details((key,), db, decode_value)
-        if result:
-            return result[0][2]  # [(db, key, VALUE, xt)].
+        cdef KTResponseHandler resp = self._get_bulk((key,), db, True)
+        return resp.read_single_value(decode_value)
 
-    cdef _set_bulk(self, data, db, expire_time, no_reply, encode_values,
-                   as_dict):
-        cdef:
-            RequestBuffer request = self.request()
-            KTResponseHandler response
-            int flags = KT_NOREPLY if no_reply else 0
+    cdef _write_set_bulk(self, RequestBuffer request, data, db, expire_time,
+                         no_reply, encode_values, as_dict):
+        cdef int flags = KT_NOREPLY if no_reply else 0
 
         if db is None:
             db = self.default_db
@@ -838,6 +1040,14 @@ cdef class KTBinaryProtocol(BinaryProtocol):
             # data is [(db0, k0, v0, xt0), (db1, k1, v1, xt1)...]
             request.write_db_key_value_expire_list(data, encode_values)
 
+    cdef _set_bulk(self, data, db, expire_time, no_reply, encode_values,
+                   as_dict):
+        cdef:
+            RequestBuffer request = self.request()
+            KTResponseHandler response
+
+        self._write_set_bulk(request, data, db, expire_time, no_reply,
+                             encode_values, as_dict)
         request.send()
         if not no_reply:
             response = self.response()
@@ -883,14 +1093,66 @@ cdef class KTBinaryProtocol(BinaryProtocol):
         :param bint encode_value: serialize value before writing
         :return: number of records written (1)
         """
-        return self._set_bulk({key: value}, db, expire_time, no_reply,
-                              encode_value, True)
-
-    cdef _remove_bulk(self, keys, db, no_reply, flat):
         cdef:
+            int flags = KT_NOREPLY if no_reply else 0
             RequestBuffer request = self.request()
             KTResponseHandler response
+
+        if db is None:
+            db = self.default_db
+
+        # Write the single record directly, rather than building a dict to
+        # pass to _set_bulk().
+        request.write_magic(KT_SET_BULK).write_int(flags)
+        request.write_key_value_with_db_expire(key, value, db,
+                                               expire_time or EXPIRE,
+                                               encode_value)
+        request.send()
+        if not no_reply:
+            response = self.response()
+            response.check_error(KT_SET_BULK)
+            return response.read_int()
+
+    def set_bulk_lists(self, keys, values, db, expire_time, no_reply=False,
+                       encode_values=True):
+        """
+        Set multiple key, value pairs, given as parallel lists, in a single
+        request.
+
+        :param list keys: keys to write
+        :param list values: values to store, one for each key
+        :param int db: db index
+        :param long expire_time: expire time in seconds from now
+        :param bint no_reply: ignore reply
+        :param bint encode_values: serialize values before writing
+        :return: number of records written
+        """
+        cdef:
             int flags = KT_NOREPLY if no_reply else 0
+            RequestBuffer request = self.request()
+            KTResponseHandler response
+
+        if len(keys) != len(values):
+            raise ValueError('keys and values must be the same length')
+        if db is None:
+            db = self.default_db
+
+        # The pairs are written as they are zipped together, rather than
+        # building a dict to pass to _set_bulk().
+        request.write_magic(KT_SET_BULK).write_int(flags)
+        request.write_key_value_pairs_with_db_expire(len(keys),
+                                                     zip(keys, values), db,
+                                                     expire_time or EXPIRE,
+                                                     encode_values)
+        request.send()
+        if not no_reply:
+            response = self.response()
+            response.check_error(KT_SET_BULK)
+            return response.read_int()
+
+    cdef _write_remove_bulk(self, RequestBuffer request, keys, db, no_reply,
+                            flat):
+        cdef int flags = KT_NOREPLY if no_reply else 0
 
         if db is None:
             db = self.default_db
@@ -902,6 +1164,13 @@ cdef class KTBinaryProtocol(BinaryProtocol):
         else:
             # [(db0, k0), (db1, k1)...]
             request.write_db_key_list(keys)
+
+    cdef _remove_bulk(self, keys, db, no_reply, flat):
+        cdef:
+            RequestBuffer request = self.request()
+            KTResponseHandler response
+
+        self._write_remove_bulk(request, keys, db, no_reply, flat)
         request.send()
 
         if not no_reply:
@@ -941,24 +1210,72 @@ cdef class KTBinaryProtocol(BinaryProtocol):
         """
         return self._remove_bulk((key,), db, no_reply, True)
 
-    def script(self, name, data=None, no_reply=False, encode_values=True,
-               decode_values=True):
+    def pipeline(self, commands):
         """
-        Evaluate a lua script.
-
-        :param name: script function name
-        :param dict data: dictionary of key, value pairs, passed as arguments
-        :param bint no_reply: ignore reply
-        :param bint encode_values: serialize values before sending to db
-        :param bint decode_values: deserialize values after reading result
-        :return: dictionary of key, value pairs returned by function
+        Send a batch of commands using a single write, then read the response
+        to each command in order.
+
+        :param list commands: a list of (cmd, data, db, expire_time, serialize)
+            tuples, where cmd is one of "get", "set", "remove" or "script".
+            For "get" and "remove", data is a list of keys, for "set" it is a
+            dict of key/value pairs, and for "script" it is a (name, params,
+            encode_values) tuple. Serialize indicates whether values should be
+            encoded ("set") or decoded ("get" and "script").
+        :return: a list containing the result of each command. Results for
+            "get" are a list of (db, key, value, expire_time) tuples, results
+            for "set" and "remove" are the number of records affected, and
+            results for "script" are a dict of the values returned.
         """
         cdef:
-            bytes bname = _encode(name)
-            bytes bkey, bval
-            int flags = KT_NOREPLY if no_reply else 0
             RequestBuffer request = self.request()
             KTResponseHandler response
+            list accum = []
+
+        if not commands:
+            return accum
+
+        for cmd, data, db, expire_time, serialize in commands:
+            if cmd == 'get':
+                self._write_get_bulk(request, data, db, True)
+            elif cmd == 'set':
+                self._write_set_bulk(request, data, db, expire_time, False,
+                                     serialize, True)
+            elif cmd == 'remove':
+                self._write_remove_bulk(request, data, db, False, True)
+            elif cmd == 'script':
+                self._write_script(request, data[0], data[1], 0, data[2])
+            else:
+                raise ValueError('unrecognized pipeline command "%s"' % cmd)
+
+        request.send()
+        response = self.response()
+        try:
+            for cmd, _, _, _, serialize in commands:
+                if cmd == 'get':
+                    response.check_error(KT_GET_BULK)
+                    accum.append(
+                        response.read_keys_values_with_db_expire(serialize))
+                elif cmd == 'set':
+                    response.check_error(KT_SET_BULK)
+                    accum.append(response.read_int())
+                elif cmd == 'script':
+                    response.check_error(KT_PLAY_SCRIPT)
+                    accum.append(response.read_keys_values_dict(serialize))
+                else:
+                    response.check_error(KT_REMOVE_BULK)
+                    accum.append(response.read_int())
+        except Exception:
+            # Responses to the remaining commands are still in-flight, so the
+            # connection cannot be used again.
+            self.close(False)
+            raise
+        return accum
+
+    cdef _write_script(self, RequestBuffer request, name, data, int flags,
+                       encode_values):
+        cdef:
+            bytes bname = _encode(name)
+            bytes bkey, bval
 
         data = data or {}
         (request
@@ -975,8 +1292,26 @@ cdef class KTBinaryProtocol(BinaryProtocol):
             (request
              .write_ii(len(bkey), len(bval))
              .write_bytes(bkey, False)
-             .write_bytes(bval, False))
+             .write_value(bval))
 
+    def script(self, name, data=None, no_reply=False, encode_values=True,
+               decode_values=True):
+        """
+        Evaluate a lua script.
+
+        :param name: script function name
+        :param dict data: dictionary of key, value pairs, passed as arguments
+        :param bint no_reply: ignore reply
+        :param bint encode_values: serialize values before sending to db
+        :param bint decode_values: deserialize values after reading result
+        :return: dictionary of key, value pairs returned by function
+        """
+        cdef:
+            int flags = KT_NOREPLY if no_reply else 0
+            RequestBuffer request = self.request()
+            KTResponseHandler response
+
+        self._write_script(request, name, data, flags, encode_values)
         request.send()
 
         if flags & KT_NOREPLY:
@@ -1227,7 +1562,7 @@ cdef class TTBinaryProtocol(BinaryProtocol):
                                          len(bkey), len(bval)), False)
          .write_bytes(bname, False)
          .write_bytes(bkey, False)
-         .write_bytes(bval, False)
+         .write_value(bval)
          .send())
 
         response = self.response()
@@ -1308,6 +1643,7 @@ cdef class TTBinaryProtocol(BinaryProtocol):
     cpdef misc(self, proc, args, update_log, decode_values=False):
         cdef:
             bytes bprocname = _encode(proc)
+            bytes barg
             int opts = 1 if update_log else 0
             RequestBuffer request = self.request()
 
@@ -1317,7 +1653,8 @@ cdef class TTBinaryProtocol(BinaryProtocol):
         pfx = struct_2siii.pack(b'\xc8\x90', len(bprocname), opts, len(args))
         request.write_bytes(pfx, False).write_bytes(bprocname, False)
         for arg in args:
-            request.write_bytes(_encode(arg), True)
+            barg = _encode(arg)
+            request.write_int(len(barg)).write_value(barg)
 
         request.send()
         response = self.response()
@@ -1527,13 +1864,13 @@ cdef class TTBinaryProtocol(BinaryProtocol):
         request.send_simple(b'\xc8\x50')
         response = self.response()
         if response.check_error():
-            return []
+            return
 
         while True:
             # iternext method.
             request.send_simple(b'\xc8\x51')
             if response.check_error():
-                raise StopIteration
+                return
             yield response.read_key()
 
     def items(self, start_key=None):
@@ -1541,7 +1878,7 @@ cdef class TTBinaryProtocol(BinaryProtocol):
         while True:
             result = self.misc_iternext()
             if result is None:
-                raise StopIteration
+                return
             yield result
 
 
@@ -1555,7 +1892,7 @@ def dict_to_table(dict d):
     return buf.getvalue()
 
 
-def table_to_dict(bytes table):
+cdef dict _table_to_dict(bytes table):
     cdef:
         bytes bkey, bval
         dict d = {}
@@ -1571,6 +1908,26 @@ def table_to_dict(bytes table):
     return d
 
 
+def table_to_dict(bytes table):
+    return _table_to_dict(table)
+
+
+def table_to_dict_bulk(list rows):
+    """
+    Convert a list of (key, table) rows, as returned by a "get" search, into a
+    list of (key, dict) rows.
+    """
+    cdef:
+        list accum = [None] * len(rows)
+        Py_ssize_t i
+        tuple row
+
+    for i in range(len(rows)):
+        row = <tuple>rows[i]
+        accum[i] = (row[0], _table_to_dict(<bytes>row[1]))
+    return accum
+
+
 # Serialization method compatible with KyotoTycoon's lua "mapdump" function.
 cdef bytes _serialize_dict(dict d):
     cdef:
@@ -1,9 +1,11 @@
 from contextlib import contextmanager
 from functools import partial
+from functools import wraps
+import gc
 import json
 import re
 import socket
-import sys
+import threading
 import time
 try:
     import cPickle as pickle
@@ -14,6 +16,10 @@ try:
     import msgpack
 except ImportError:
     msgpack = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
 
 from ._binary import KTBinaryProtocol
 from ._binary import TTBinaryProtocol
@@ -21,6 +27,7 @@ from ._binary import decode
 from ._binary import dict_to_table
 from ._binary import encode
 from ._binary import table_to_dict
+from ._binary import table_to_dict_bulk
 from .constants import IOP_DELETE
 from .constants import IOP_KEEP
 from .constants import IOP_OPTIMIZE
@@ -33,10 +40,6 @@ from .exceptions import ServerError
 from .http import HttpProtocol
 
 
-if sys.version_info[0] > 2:
-    basestring = (bytes, str)
-
-
 KT_BINARY = 'binary'
 KT_JSON = 'json'
 KT_MSGPACK = 'msgpack'
@@ -47,50 +50,126 @@ KT_SERIALIZERS = set((KT_BINARY, KT_JSON, KT_MSGPACK, KT_NONE, KT_PICKLE,
                       TT_TABLE))
 
 
+# Serializer functions are defined once at module-level. json.dumps() builds a
+# new encoder whenever non-default options are given, so a single encoder is
+# shared instead. The pickle protocol is passed positionally, avoiding the
+# keyword-argument handling of a partial().
+_json_encoder = json.JSONEncoder(separators=(',', ':'))
+_json_decoder = json.JSONDecoder()
+_PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+_monotonic = getattr(time, 'monotonic', time.time)
+
+# Bulk operations on more items than this run with the cyclic garbage collector
+# paused, as the values they (de)serialize would otherwise trigger collections
+# part-way through the request.
+_GC_PAUSE_THRESHOLD = 128
+
+
+def _pause_gc(method):
+    @wraps(method)
+    def inner(self, *args, **kwargs):
+        # The items are the first argument: "data" or "keys".
+        if args:
+            items = args[0]
+        else:
+            items = kwargs.get('data', kwargs.get('keys'))
+        if items is None or len(items) <= _GC_PAUSE_THRESHOLD:
+            return method(self, *args, **kwargs)
+        gcold = gc.isenabled()
+        gc.disable()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            if gcold:
+                gc.enable()
+    return inner
+
+
+def _json_encode(value):
+    return _json_encoder.encode(value).encode('utf-8')
+
+
+def _json_decode(data):
+    return _json_decoder.decode(data.decode('utf-8'))
+
+
+if msgspec is not None:
+    # msgspec reads and writes the same msgpack encoding, and is faster. A
+    # shared Encoder and Decoder skip the per-call setup of the module-level
+    # encode() and decode() functions.
+    _msgpack_encode = msgspec.msgpack.Encoder().encode
+    _msgpack_decode = msgspec.msgpack.Decoder().decode
+else:
+    # packb() constructs a new Packer on every call, which costs more than
+    # packing a small value. Packers are not thread-safe, so each thread keeps
+    # its own.
+    _msgpack_local = threading.local()
+
+    def _msgpack_encode(value):
+        try:
+            packer = _msgpack_local.packer
+        except AttributeError:
+            packer = _msgpack_local.packer = msgpack.Packer(use_bin_type=True)
+        return packer.pack(value)
+
+    def _msgpack_decode(data):
+        return msgpack.unpackb(data, raw=False)
+
+
+def _pickle_encode(value):
+    return pickle.dumps(value, _PICKLE_PROTOCOL)
+
+
+def _noop(data):
+    return data
+
+
+_SERIALIZERS = {
+    KT_BINARY: (encode, decode),
+    KT_JSON: (_json_encode, _json_decode),
+    KT_MSGPACK: (_msgpack_encode, _msgpack_decode),
+    KT_NONE: (encode, _noop),
+    KT_PICKLE: (_pickle_encode, pickle.loads),
+    TT_TABLE: (dict_to_table, table_to_dict),
+}
+
+
 class BaseClient(object):
+    __slots__ = ('_host', '_port', '_serializer', '_decode_keys', '_timeout',
+                 '_connection_pool', '_status_ttl', '_status_cache',
+                 '_encode_value', '_decode_value', '_protocol',
+                 '_script_runner', '__weakref__')
+
     def __init__(self, host='127.0.0.1', port=1978, serializer=KT_BINARY,
-                 decode_keys=True, timeout=None, connection_pool=False):
+                 decode_keys=True, timeout=None, connection_pool=False,
+                 status_ttl=0):
         self._host = host
         self._port = port
         self._serializer = serializer
         self._decode_keys = decode_keys
         self._timeout = timeout
         self._connection_pool = connection_pool
+        self._status_ttl = status_ttl
+        self._status_cache = {}
+        self._script_runner = None
 
-        if self._serializer == KT_MSGPACK and msgpack is None:
+        if (self._serializer == KT_MSGPACK and msgpack is None and
+                msgspec is None):
             raise ImproperlyConfigured('msgpack library not found')
-        elif self._serializer == KT_BINARY:
-            self._encode_value = encode
-            self._decode_value = decode
-        elif self._serializer == KT_JSON:
-            self._encode_value = lambda v: (json
-                                            .dumps(v, separators=(',', ':'))
-                                            .encode('utf-8'))
-            self._decode_value = lambda v: json.loads(v.decode('utf-8'))
-        elif self._serializer == KT_MSGPACK:
-            self._encode_value = lambda o: msgpack.packb(o, use_bin_type=True)
-            self._decode_value = lambda b: msgpack.unpackb(b, raw=False)
-        elif self._serializer == KT_NONE:
-            self._encode_value = encode
-            self._decode_value = lambda x: x
-        elif self._serializer == KT_PICKLE:
-            self._encode_value = partial(pickle.dumps,
-                                         protocol=pickle.HIGHEST_PROTOCOL)
-            self._decode_value = pickle.loads
-        elif self._serializer == TT_TABLE:
-            self._encode_value = dict_to_table
-            self._decode_value = table_to_dict
-        else:
+        elif self._serializer not in _SERIALIZERS:
             raise ImproperlyConfigured('unrecognized serializer "%s" - use one'
                                        ' of: %s' % (self._serializer,
                                                     ','.join(KT_SERIALIZERS)))
 
+        self._encode_value, self._decode_value = _SERIALIZERS[self._serializer]
+
         # Session and socket used for rpc and binary protocols, respectively.
         self._initialize_protocols()
 
     @property
     def lua(self):
-        if not hasattr(self, '_script_runner'):
+        if self._script_runner is None:
             self._script_runner = ScriptRunner(self)
         return self._script_runner
 
@@ -112,18 +191,255 @@ class BaseClient(object):
     def close_idle(self, cutoff=60):
         return self._protocol.close_idle(cutoff)
 
+    def _cached_status(self, key, fetch):
+        # Reuse the last status for up to status_ttl seconds, so bursts of
+        # status-derived lookups (len, count, size) share one round-trip.
+        # Callers get a copy, so changes they make do not leak into the cache.
+        if not self._status_ttl:
+            return fetch()
+        now = _monotonic()
+        cached = self._status_cache.get(key)
+        if cached is not None and now - cached[0] < self._status_ttl:
+            return dict(cached[1])
+        status = fetch()
+        self._status_cache[key] = (now, status)
+        return dict(status)
+
 
 class ScriptRunner(object):
     def __init__(self, client):
         self.client = client
 
     def __getattr__(self, attr_name):
-        def run_script(*args, **kwargs):
-            return self.client._script(attr_name, *args, **kwargs)
+        # Cache the bound script on the instance, so later lookups of the same
+        # name are plain attribute loads and no longer reach __getattr__.
+        if attr_name.startswith('__'):
+            raise AttributeError(attr_name)
+        run_script = partial(self.client._script, attr_name)
+        setattr(self, attr_name, run_script)
         return run_script
 
 
+def _first_value(result):
+    if result:
+        return result[0][2]  # [(db, key, VALUE, xt)].
+
+
+def _to_dict(result):
+    return dict((key, value) for _, key, value, _ in result)
+
+
+class Pipeline(object):
+    """
+    Queue up commands and send them to the server in batches, reading the
+    responses for each batch at once. If a depth is given, the queue is
+    flushed whenever it reaches that many commands.
+
+    Consecutive single-key gets, or single-key sets, that use the same
+    database, expire time and serialization are merged into a single bulk
+    command when the batch is sent.
+    """
+    def __init__(self, client, depth=None):
+        self.client = client
+        self._depth = depth
+        self._commands = []
+        self._results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.execute()
+
+    def __len__(self):
+        return len(self._commands)
+
+    def _queue(self, command, converter=None, merge_key=None):
+        self._commands.append((command, converter, merge_key))
+        if self._depth and len(self._commands) >= self._depth:
+            self.flush()
+        return self
+
+    def flush(self):
+        if not self._commands:
+            return
+        queued, self._commands = self._commands, []
+
+        # Group runs of commands that share a merge key, so that each group
+        # is sent as one command: [(command, converter, merge_key, [data])].
+        groups = []
+        for command, converter, merge_key in queued:
+            if merge_key is not None and groups and groups[-1][2] == merge_key:
+                groups[-1][3].append(command[1])
+            else:
+                groups.append((command, converter, merge_key, [command[1]]))
+
+        commands = []
+        for command, _, merge_key, data in groups:
+            if len(data) > 1:
+                cmd, _, db, expire_time, serialize = command
+                if cmd == 'get':
+                    command = (cmd, [keys[0] for keys in data], db, None,
+                               serialize)
+                else:
+                    merged = {}
+                    for item in data:
+                        merged.update(item)
+                    command = (cmd, merged, db, expire_time, serialize)
+            commands.append(command)
+
+        try:
+            results = self.client._protocol.pipeline(commands)
+        except Exception:
+            # The failed batch is lost, so results of earlier batches would no
+            # longer line up with the commands that were queued.
+            self._results = []
+            raise
+
+        for (command, converter, _, data), result in zip(groups, results):
+            if len(data) == 1:
+                if converter is not None:
+                    result = converter(result)
+                self._results.append(result)
+            elif command[0] == 'get':
+                # Keys may be returned decoded, so match them as bytes.
+                values = dict((encode(key), value)
+                              for _, key, value, _ in result)
+                for keys in data:
+                    self._results.append(values.get(encode(keys[0])))
+            else:
+                # Each single-key set stores one record. The server's count is
+                # for the merged dict, in which a repeated key only appears
+                # once, so it cannot be split up between the sets.
+                self._results.extend([1] * len(data))
+
+    def execute(self):
+        self.flush()
+        results, self._results = self._results, []
+        return results
+
+    def get(self, key, db=None):
+        return self._queue(('get', (key,), db, None, True), _first_value,
+                           ('get', db, None, True))
+
+    def get_bytes(self, key, db=None):
+        return self._queue(('get', (key,), db, None, False), _first_value,
+                           ('get', db, None, False))
+
+    def get_bulk(self, keys, db=None, decode_values=True):
+        return self._queue(('get', keys, db, None, decode_values), _to_dict)
+
+    def set(self, key, value, db=None, expire_time=None):
+        return self._queue(('set', {key: value}, db, expire_time, True), None,
+                           ('set', db, expire_time, True))
+
+    def set_bytes(self, key, value, db=None, expire_time=None):
+        return self._queue(('set', {key: value}, db, expire_time, False), None,
+                           ('set', db, expire_time, False))
+
+    def set_bulk(self, data, db=None, expire_time=None, encode_values=True):
+        return self._queue(('set', data, db, expire_time, encode_values))
+
+    def remove(self, key, db=None):
+        return self._queue(('remove', (key,), db, None, False))
+
+    def remove_bulk(self, keys, db=None):
+        return self._queue(('remove', keys, db, None, False))
+
+    def script(self, name, data=None, encode_values=True, decode_values=True):
+        return self._queue(('script', (name, data, encode_values), None, None,
+                            decode_values))
+
+
+class HttpPipeline(object):
+    """
+    Queue up commands that are only available over HTTP, and send them to the
+    server as pipelined requests on a single connection. If a depth is given,
+    the queue is flushed whenever it reaches that many commands.
+    """
+    def __init__(self, client, depth=None):
+        self.client = client
+        self._depth = depth
+        self._commands = []
+        self._results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.execute()
+
+    def __len__(self):
+        return len(self._commands)
+
+    def _queue(self, command):
+        self._commands.append(command)
+        if self._depth and len(self._commands) >= self._depth:
+            self.flush()
+        return self
+
+    def flush(self):
+        if not self._commands:
+            return
+        queued, self._commands = self._commands, []
+        try:
+            self._results.extend(self.client._http.pipeline(queued))
+        except Exception:
+            # As in Pipeline.flush(), results of earlier batches would no
+            # longer line up with the commands that were queued.
+            self._results = []
+            raise
+
+    def execute(self):
+        self.flush()
+        results, self._results = self._results, []
+        return results
+
+    def get(self, key, db=None):
+        return self._queue(self.client._http.get_command(key, db))
+
+    def set(self, key, value, db=None, expire_time=None):
+        return self._queue(self.client._http.set_command(key, value, db,
+                                                         expire_time))
+
+    def add(self, key, value, db=None, expire_time=None, encode_value=True):
+        return self._queue(self.client._http.add_command(
+            key, value, db, expire_time, encode_value))
+
+    def replace(self, key, value, db=None, expire_time=None,
+                encode_value=True):
+        return self._queue(self.client._http.replace_command(
+            key, value, db, expire_time, encode_value))
+
+    def append(self, key, value, db=None, expire_time=None, encode_value=True):
+        return self._queue(self.client._http.append_command(
+            key, value, db, expire_time, encode_value))
+
+    def exists(self, key, db=None):
+        return self._queue(self.client._http.check_command(key, db))
+
+    def remove(self, key, db=None):
+        return self._queue(self.client._http.remove_command(key, db))
+
+    def cas(self, key, old_val, new_val, db=None, expire_time=None,
+            encode_value=True):
+        return self._queue(self.client._http.cas_command(
+            key, old_val, new_val, db, expire_time, encode_value))
+
+    def incr(self, key, n=1, orig=None, db=None, expire_time=None):
+        return self._queue(self.client._http.increment_command(
+            key, n, orig, db, expire_time))
+
+    def incr_double(self, key, n=1., orig=None, db=None, expire_time=None):
+        return self._queue(self.client._http.increment_double_command(
+            key, n, orig, db, expire_time))
+
+
 class KyotoTycoon(BaseClient):
+    __slots__ = ('_default_db', '_http', '_get', '_set', '_remove')
+
     def __init__(self, *args, **kwargs):
         self._default_db = kwargs.pop('default_db', 0)
         super(KyotoTycoon, self).__init__(*args, **kwargs)
@@ -145,7 +461,13 @@ class KyotoTycoon(BaseClient):
             decode_keys=self._decode_keys,
             encode_value=self._encode_value,
             decode_value=self._decode_value,
-            default_db=self._default_db)
+            default_db=self._default_db,
+            connection_pool=self._connection_pool)
+
+        # Bound once, as they are called for every dict-style access.
+        self._get = self._protocol.get
+        self._set = self._protocol.set
+        self._remove = self._protocol.remove
 
     def open(self):
         self._http.connect()
@@ -155,6 +477,7 @@ class KyotoTycoon(BaseClient):
         self._protocol.close(allow_reuse)
         self._http.close()
 
+    @_pause_gc
     def get_bulk(self, keys, db=None, decode_values=True):
         return self._protocol.get_bulk(keys, db, decode_values)
 
@@ -173,6 +496,7 @@ class KyotoTycoon(BaseClient):
     def get_bytes(self, key, db=None):
         return self._protocol.get(key, db, False)
 
+    @_pause_gc
     def set_bulk(self, data, db=None, expire_time=None, no_reply=False,
                  encode_values=True):
         return self._protocol.set_bulk(data, db, expire_time, no_reply,
@@ -181,6 +505,27 @@ class KyotoTycoon(BaseClient):
     def set_bulk_raw(self, data, no_reply=False, encode_values=True):
         return self._protocol.set_bulk_raw(data, no_reply, encode_values)
 
+    @_pause_gc
+    def set_bulk_lists(self, keys, values, db=None, expire_time=None,
+                       no_reply=False, encode_values=True):
+        return self._protocol.set_bulk_lists(keys, values, db, expire_time,
+                                             no_reply, encode_values)
+
+    def set_bulk_array(self, keys, values, db=None, expire_time=None,
+                       no_reply=False):
+        # Any two-dimensional buffer (e.g. a numpy uint8 array) is accepted.
+        # The rows are sliced from a single copy of the underlying memory
+        # and stored as-is, bypassing the value serializer.
+        view = memoryview(values)
+        if view.ndim != 2 or view.shape[0] != len(keys):
+            raise ValueError('values must be a two-dimensional buffer with '
+                             'one row per key')
+        buf = view.tobytes()
+        width = len(buf) // len(keys) if keys else 0
+        rows = [buf[i * width:(i + 1) * width] for i in range(len(keys))]
+        return self._protocol.set_bulk_lists(keys, rows, db, expire_time,
+                                             no_reply, False)
+
     def set(self, key, value, db=None, expire_time=None, no_reply=False):
         return self._protocol.set(key, value, db, expire_time, no_reply, True)
 
@@ -196,6 +541,12 @@ class KyotoTycoon(BaseClient):
     def remove(self, key, db=None, no_reply=False):
         return self._protocol.remove(key, db, no_reply)
 
+    def pipeline(self, depth=None):
+        return Pipeline(self, depth)
+
+    def http_pipeline(self, depth=None):
+        return HttpPipeline(self, depth)
+
     def _script(self, name, __data=None, no_reply=False, encode_values=True,
                 decode_values=True, **kwargs):
         if __data is None:
@@ -211,10 +562,13 @@ class KyotoTycoon(BaseClient):
                                      decode_values)
 
     def clear(self, db=None):
+        self._status_cache.clear()
         return self._http.clear(db)
 
     def status(self, db=None):
-        return self._http.status(db)
+        if db is None:
+            db = self._default_db
+        return self._cached_status(db, lambda: self._http.status(db))
 
     def report(self):
         return self._http.report()
@@ -268,21 +622,31 @@ class KyotoTycoon(BaseClient):
             return key
         return (key, None)
 
+    # The dict-style methods only call _kdb_from_key() for (key, db) tuples,
+    # so that plain keys skip the extra call and tuple allocation.
     def __getitem__(self, key):
-        return self.get(*self._kdb_from_key(key))
+        if isinstance(key, tuple):
+            return self.get(*self._kdb_from_key(key))
+        return self._get(key, None, True)
 
     def __setitem__(self, key, value):
-        key, db = self._kdb_from_key(key)
+        if isinstance(key, tuple):
+            key, db = self._kdb_from_key(key)
+        else:
+            db = None
         if isinstance(value, tuple):
             if len(value) != 2:
                 raise ValueError('expected value-tuple of (value, expires)')
             value, expire_time = value
         else:
             expire_time = None
-        self._protocol.set(key, value, db, expire_time, no_reply=True)
+        self._set(key, value, db, expire_time, True)
 
     def __delitem__(self, key):
-        self.remove(*self._kdb_from_key(key))
+        if isinstance(key, tuple):
+            self.remove(*self._kdb_from_key(key))
+        else:
+            self._remove(key, None, False)
 
     def update(self, __data=None, **kwargs):
         if __data is None:
@@ -294,7 +658,9 @@ class KyotoTycoon(BaseClient):
     pop = seize
 
     def __contains__(self, key):
-        return self.exists(*self._kdb_from_key(key))
+        if isinstance(key, tuple):
+            return self.exists(*self._kdb_from_key(key))
+        return self.exists(key)
 
     def __len__(self):
         return int(self.status()['count'])
@@ -318,10 +684,9 @@ class KyotoTycoon(BaseClient):
         cursor = self.cursor(db=db)
         if not cursor.jump(): return
         while True:
-            key = cursor.key()
+            key = cursor.key(step=True)
             if key is None: return
             yield key
-            if not cursor.step(): return
 
     def keys_nonlazy(self, db=None):
         return self.match_prefix('', db=db)
@@ -330,19 +695,17 @@ class KyotoTycoon(BaseClient):
         cursor = self.cursor(db=db)
         if not cursor.jump(): return
         while True:
-            value = cursor.value()
+            value = cursor.value(step=True)
             if value is None: return
             yield value
-            if not cursor.step(): return
 
     def items(self, db=None):
         cursor = self.cursor(db=db)
         if not cursor.jump(): return
         while True:
-            kv = cursor.get()
+            kv = cursor.get(step=True)
             if kv is None: return
             yield kv
-            if not cursor.step(): return
 
     def __iter__(self):
         return iter(self.keys())
@@ -356,13 +719,25 @@ class KyotoTycoon(BaseClient):
         return decode(self.status()['path'])
 
     def set_database(self, db):
-        self._default_database = db
+        self._default_db = db
+        self._status_cache.clear()
         self._protocol.set_database(db)
         self._http.set_database(db)
         return self
 
 
+def _coerce_status_value(val):
+    # Convert integer and decimal values, leaving anything else unchanged.
+    if val.isdecimal():
+        return int(val)
+    elif val.count('.') == 1 and val.replace('.', '', 1).isdecimal():
+        return float(val)
+    return val
+
+
 class TokyoTyrant(BaseClient):
+    __slots__ = ('_putnr',)
+
     def _initialize_protocols(self):
         self._protocol = TTBinaryProtocol(
             host=self._host,
@@ -373,6 +748,10 @@ class TokyoTyrant(BaseClient):
             timeout=self._timeout,
             connection_pool=self._connection_pool)
 
+        # Bound once, as it is called for every dict-style assignment.
+        self._putnr = self._protocol.putnr
+
+    @_pause_gc
     def get_bulk(self, keys, decode_values=True):
         return self._protocol.mget(keys, decode_values)
 
@@ -382,6 +761,7 @@ class TokyoTyrant(BaseClient):
     def get_bytes(self, key):
         return self._protocol.get(key, False)
 
+    @_pause_gc
     def set_bulk(self, data, no_reply=False, encode_values=True):
         if no_reply:
             self._protocol.putnr_bulk(data, encode_values)
@@ -429,19 +809,18 @@ class TokyoTyrant(BaseClient):
     _script = script
 
     def clear(self):
+        self._status_cache.clear()
         return self._protocol.vanish()
 
     def status(self):
+        return self._cached_status(None, self._status)
+
+    def _status(self):
         data = self._protocol.stat()
         status = {}
         for key_value in data.decode('utf-8').splitlines():
             key, val = key_value.split('\t', 1)
-            if val.replace('.', '').isdigit():
-                try:
-                    val = float(val) if val.find('.') >= 0 else int(val)
-                except ValueError:
-                    pass
-            status[key] = val
+            status[key] = _coerce_status_value(val)
         return status
 
     def synchronize(self):
@@ -484,7 +863,7 @@ class TokyoTyrant(BaseClient):
             return self.get(item)
 
     def __setitem__(self, key, value):
-        self._protocol.putnr(key, value, True)
+        self._putnr(key, value, True)
 
     __delitem__ = remove
     __contains__ = exists
@@ -601,9 +980,10 @@ class TokyoTyrant(BaseClient):
 
 
 def _pack_misc_cmd(*args):
-    message = [encode(str(arg) if not isinstance(arg, basestring) else arg)
-               for arg in args]
-    return b'\x00'.join(message)
+    # encode() converts non-string arguments using str() itself, but passes
+    # None through unchanged, so None is sent as the string "None".
+    return b'\x00'.join([encode(arg if arg is not None else 'None')
+                          for arg in args])
 
 
 def clone_query(method):
@@ -615,27 +995,37 @@ def clone_query(method):
 
 
 class QueryBuilder(object):
+    __slots__ = ('_conditions', '_order_by', '_limit', '_offset', '_search',
+                 '_packed', '__weakref__')
+
     def __init__(self):
-        self._conditions = []
-        self._order_by = []
+        # Conditions and orderings are immutable tuples, so clones can share
+        # them and each modification only copies the one it extends.
+        self._conditions = ()
+        self._order_by = ()
         self._limit = None
         self._offset = None
 
+        # Methods that modify the query return a fresh clone, so the search
+        # expressions only need to be built (and packed) once per instance.
+        self._search = None
+        self._packed = None
+
     def clone(self):
         obj = QueryBuilder()
-        obj._conditions = list(self._conditions)
-        obj._order_by = list(self._order_by)
+        obj._conditions = self._conditions
+        obj._order_by = self._order_by
         obj._limit = self._limit
         obj._offset = self._offset
         return obj
 
     @clone_query
     def filter(self, column, op, value):
-        self._conditions.append((column, op, value))
+        self._conditions += ((column, op, value),)
 
     @clone_query
     def order_by(self, column, ordering=None):
-        self._order_by.append((column, ordering or ORDER_STR_ASC))
+        self._order_by += ((column, ordering or ORDER_STR_ASC),)
 
     @clone_query
     def limit(self, limit=None):
@@ -646,25 +1036,32 @@ class QueryBuilder(object):
         self._offset = offset
 
     def build_search(self):
+        if self._search is not None:
+            return self._search
+
         cmd = [('addcond', col, op, val) for col, op, val in self._conditions]
         for col, order in self._order_by:
             cmd.append(('setorder', col, order))
         if self._limit is not None or self._offset is not None:
             cmd.append(('setlimit', self._limit or 1 << 31, self._offset or 0))
-        return cmd
+        self._search = tuple(cmd)
+        return self._search
+
+    def _execute(self, client, cmd=None):
+        if self._packed is None:
+            self._packed = tuple([_pack_misc_cmd(*expr)
+                                  for expr in self.build_search()])
+        # misc_search() appends the command to the list it is given.
+        return client._protocol.misc_search(list(self._packed), cmd)
 
     def execute(self, client):
-        return client.search(self.build_search())
+        return self._execute(client)
 
     def delete(self, client):
-        return client.search(self.build_search(), 'out')
+        return self._execute(client, 'out')
 
     def get(self, client):
-        results = client.search(self.build_search(), 'get')
-        accum = []
-        for key, raw_data in results:
-            accum.append((key, table_to_dict(raw_data)))
-        return accum
+        return table_to_dict_bulk(self._execute(client, 'get'))
 
     def count(self, client):
-        return client.search(self.build_search(), 'count')
+        return self._execute(client, 'count')
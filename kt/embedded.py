@@ -1,11 +1,18 @@
 import atexit
 import logging
-import random
 import socket
 import subprocess
 import sys
 import threading
 import time
+try:
+    from shutil import which
+except ImportError:
+    which = None
+try:
+    from subprocess import DEVNULL
+except ImportError:
+    DEVNULL = subprocess.PIPE
 
 from .client import KT_BINARY
 from .client import KyotoTycoon
@@ -15,8 +22,22 @@ from .exceptions import KyotoTycoonError
 
 logger = logging.getLogger(__name__)
 
+_monotonic = getattr(time, 'monotonic', time.time)
+
+# Popen launches the server with posix_spawn(), which avoids copying the parent
+# process, only on Python 3.8+, given the full path to the executable and with
+# close_fds disabled. Descriptors Python creates are non-inheritable there (PEP
+# 446), so only ones the application explicitly marked inheritable reach the
+# server. Older versions keep closing descriptors in the child.
+_CLOSE_FDS = sys.version_info < (3, 8)
+
 
 class EmbeddedServer(object):
+    __slots__ = ('_server', '_host', '_port', '_serializer', '_database',
+                 '_server_args', '_quiet', '_connection_pool',
+                 '_server_started', '_server_terminated', '_server_p',
+                 '_server_t', '_client', '__weakref__')
+
     def __init__(self, server='ktserver', host='127.0.0.1', port=None,
                  database='*', serializer=None, server_args=None, quiet=False,
                  connection_pool=False):
@@ -34,8 +55,9 @@ class EmbeddedServer(object):
         self._server_terminated = threading.Event()
         self._server_terminated.set()  # Start off in terminated state.
 
-        # Placeholders for server process and client.
+        # Placeholders for server process, its monitor thread and client.
         self._server_p = None
+        self._server_t = None
         self._client = None
 
     def _create_client(self):
@@ -56,8 +78,9 @@ class EmbeddedServer(object):
             return self._server_p.pid
 
     def _run_server(self, port):
+        server = (which and which(self._server)) or self._server
         command = [
-            self._server,
+            server,
             '-le',  # Log errors.
             '-host',
             self._host,
@@ -66,10 +89,11 @@ class EmbeddedServer(object):
 
         while not self._server_terminated.is_set():
             if self._quiet:
-                out, err = subprocess.PIPE, subprocess.PIPE
+                out = err = DEVNULL
             else:
-                out, err = sys.__stdout__.fileno(), sys.__stderr__.fileno()
-            self._server_p = subprocess.Popen(command, stderr=err, stdout=out)
+                out = err = None  # Inherit our stdout and stderr.
+            self._server_p = subprocess.Popen(command, stderr=err, stdout=out,
+                                              close_fds=_CLOSE_FDS)
 
             self._server_started.set()
             self._server_p.wait()
@@ -85,7 +109,11 @@ class EmbeddedServer(object):
         self._server_terminated.set()
         self._server_p.terminate()
         self._server_p.wait()
-        self._server_p = self._client = None
+
+        # Wait for the monitor thread to exit, so it cannot restart the server
+        # if run() is called again right away.
+        self._server_t.join()
+        self._server_p = self._server_t = self._client = None
 
     def run(self):
         """
@@ -101,25 +129,30 @@ class EmbeddedServer(object):
         self._server_started.clear()
         self._server_terminated.clear()
 
-        t = threading.Thread(target=self._run_server, args=(self._port,))
-        t.daemon = True
-        t.start()
+        self._server_t = threading.Thread(target=self._run_server,
+                                          args=(self._port,))
+        self._server_t.daemon = True
+        self._server_t.start()
 
         self._server_started.wait()  # Wait for server to start up.
         atexit.register(self._stop_server)
 
-        attempts = 0
-        while attempts < 20:
-            attempts += 1
+        # Poll until the server accepts connections, backing off exponentially
+        # so a server that comes up quickly is detected quickly.
+        delay = 0.001
+        deadline = _monotonic() + 2
+        while True:
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             try:
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
                 s.connect((self._host, self._port))
-                s.close()
                 return True
-            except socket.error:
-                time.sleep(0.1)
-            except OSError:
-                time.sleep(0.1)
+            except (socket.error, OSError):
+                if _monotonic() >= deadline:
+                    break
+                time.sleep(delay)
+                delay = min(delay * 2, 0.05)
+            finally:
+                s.close()
 
         self._stop_server()
         raise KyotoTycoonError('Unable to connect to server on %s:%s' %
@@ -140,25 +173,32 @@ class EmbeddedServer(object):
             atexit._exithandlers = funcs
         self._stop_server()
 
+    def reset(self):
+        """
+        Restart the server on the same port and return a new client. With the
+        default in-memory database this discards all data, which is much
+        faster than clearing a large database.
+        """
+        if not self._server_terminated.is_set():
+            if self._client is not None:
+                self._client.close(allow_reuse=False)
+            self.stop()
+        self.run()
+        return self.client
+
     def _find_open_port(self):
+        # Let the kernel pick a free ephemeral port.
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        attempts = 0
-        while attempts < 32:
-            attempts += 1
-            port = random.randint(16000, 32000)
-            try:
-                sock.bind(('127.0.0.1', port))
-                sock.listen(1)
-                sock.close()
-                time.sleep(0.1)
-                return port
-            except OSError:
-                pass
-
-        raise KyotoTycoonError('Could not find open port')
+        try:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+        finally:
+            sock.close()
 
 
 class EmbeddedTokyoTyrantServer(EmbeddedServer):
+    __slots__ = ()
+
     def __init__(self, server='ttserver', host='127.0.0.1', port=None,
                  database='*', serializer=None, server_args=None, quiet=False,
                  connection_pool=False):
@@ -2,14 +2,15 @@ from base64 import b64decode
 from base64 import b64encode
 from functools import partial
 import datetime
+import socket
 import sys
+import threading
+import time
 try:
-    from http.client import HTTPConnection
     from urllib.parse import quote_from_bytes
     from urllib.parse import unquote_to_bytes
     from urllib.parse import urlencode
 except ImportError:
-    from httplib import HTTPConnection
     from urllib import quote as quote_from_bytes
     from urllib import unquote as unquote_to_bytes
     from urllib import urlencode
@@ -17,18 +18,23 @@ except ImportError:
 from ._binary import decode
 from ._binary import encode
 from .exceptions import ProtocolError
+from .exceptions import ServerConnectionError
 from .exceptions import ServerError
 
 
 IS_PY2 = sys.version_info[0] == 2
 
-if not IS_PY2:
+if IS_PY2:
+    ConnectionError = socket.error
+else:
     unicode = str
 
 
 quote_b = partial(quote_from_bytes, safe='')
 unquote_b = partial(unquote_to_bytes)
 
+_monotonic = getattr(time, 'monotonic', time.time)
+
 
 def decode_from_content_type(content_type):
     if content_type.endswith('colenc=B'):
@@ -37,13 +43,35 @@ def decode_from_content_type(content_type):
         return unquote_b
 
 
+# Converters for the response to a command, called with (data, status).
+def _found(resp, status):
+    return status != 450
+
+
+def _num_int(resp, status):
+    return int(resp[b'num'])
+
+
+def _num_float(resp, status):
+    return float(resp[b'num'])
+
+
+# Requests that can safely be sent again if a pooled connection was closed
+# before any response arrived, because running them twice has the same effect
+# and result as running them once.
+_IDEMPOTENT = frozenset(('/check', '/get', '/get_bulk', '/match_prefix',
+                         '/match_regex', '/match_similar', '/report', '/set',
+                         '/set_bulk', '/status', '/ulog_list'))
+
+
 class HttpProtocol(object):
     _content_type = 'text/tab-separated-values; colenc=B'
     cursor_id = 0
 
     def __init__(self, host='127.0.0.1', port=1978, decode_keys=True,
                  encode_value=None, decode_value=None, timeout=None,
-                 default_db=None):
+                 default_db=None, connection_pool=False, max_idle=None,
+                 max_age=20):
         self._host = host
         self._port = port
         self._timeout = timeout
@@ -52,40 +80,95 @@ class HttpProtocol(object):
         self.decode_value = decode_value or decode
         self.default_db = default_db or 0
         self._prefix = '/rpc'
-        self._conn = self._get_conn()
-        self._headers = {'Content-Type': self._content_type}
+
+        # Everything but the path and the Content-Length is the same for every
+        # request, so the request head is formatted from a single template.
+        self._request_head = (
+            'POST %s%%s HTTP/1.1\r\n'
+            'Host: %s:%s\r\n'
+            'Content-Type: %s\r\n'
+            'Content-Length: %%d\r\n\r\n' % (
+                self._prefix, host, port, self._content_type))
+
+        # Idle keep-alive connections, as (last used, conn) pairs with the
+        # most recently used last. Each request takes the most recently used
+        # one (or opens a new one), so threads sharing the client never
+        # interleave requests on the same connection. Without a connection
+        # pool a single idle connection is kept. Connections idle for longer
+        # than max_age are closed rather than reused, as ktserver closes
+        # sessions idle for 30 seconds by default. close() advances the
+        # generation, so connections checked out before it are not pooled.
+        if max_idle is None:
+            max_idle = 32 if connection_pool else 1
+        self._max_idle = max_idle
+        self._max_age = max_age
+        self._pool = []
+        self._mutex = threading.Lock()
+        self._generation = 0
 
     def set_database(self, db):
         self.default_db = db
 
     def _get_conn(self):
-        return HTTPConnection(self._host, self._port, timeout=self._timeout)
+        sock = socket.create_connection((self._host, self._port),
+                                        self._timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock, sock.makefile('rb')
+
+    def _close_conn(self, conn):
+        sock, rfile = conn
+        rfile.close()
+        sock.close()
 
     def connect(self):
         self.close()
-        self._conn = self._get_conn()
-        self._conn.connect()
+        self._put_conn(self._get_conn(), self._generation)
         return True
 
+    def _take_conn(self):
+        # Returns the most recently used idle connection, or None.
+        threshold = _monotonic() - self._max_age
+        with self._mutex:
+            if not self._pool:
+                return
+            if self._pool[-1][0] > threshold:
+                return self._pool.pop()[1]
+
+            # The most recently used connection is too old, so all are.
+            stale, self._pool = self._pool, []
+        for _, conn in stale:
+            self._close_conn(conn)
+
+    def _put_conn(self, conn, generation):
+        with self._mutex:
+            if (generation == self._generation and
+                    len(self._pool) < self._max_idle):
+                self._pool.append((_monotonic(), conn))
+                return
+        self._close_conn(conn)
+
     def close(self):
-        self._conn.close()
+        with self._mutex:
+            self._generation += 1
+            pool, self._pool = self._pool, []
+        for _, conn in pool:
+            self._close_conn(conn)
 
     def __del__(self):
-        self._conn.close()
+        if getattr(self, '_pool', None):
+            self.close()
 
-    def _encode_keys_values(self, data):
-        accum = []
+    def _encode_keys_values(self, data, accum):
         for key, value in data.items():
             bkey = encode(key)
             bvalue = encode(value)
             accum.append(b'%s\t%s' % (b64encode(bkey), b64encode(bvalue)))
-        return b'\n'.join(accum)
+        return accum
 
-    def _encode_keys(self, keys):
-        accum = []
+    def _encode_keys(self, keys, accum):
         for key in keys:
             accum.append(b'%s\t' % b64encode(b'_' + encode(key)))
-        return b'\n'.join(accum)
+        return accum
 
     def _decode_response(self, tsv, content_type, decode_keys=None):
         if decode_keys is None:
@@ -107,42 +190,137 @@ class HttpProtocol(object):
 
         return accum
 
-    def _post(self, path, body):
-        self._conn.request('POST', self._prefix + path, body, self._headers)
-        return self._conn.getresponse()
+    def _read_response(self, rfile, line):
+        # KyotoTycoon always replies with a Content-Length, so a minimal
+        # parser is sufficient and avoids the cost of http.client's header
+        # parsing. The status line is read by the caller.
+        try:
+            status = int(line.split(None, 2)[1])
+        except (IndexError, ValueError):
+            raise ProtocolError('invalid status line: %r' % line)
+
+        content_type = ''
+        length = None
+        keep_alive = True
+        while True:
+            line = rfile.readline(65537)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.partition(b':')
+            name = name.strip().lower()
+            if name == b'content-length':
+                length = int(value)
+            elif name == b'content-type':
+                content_type = value.strip().decode('latin-1')
+            elif name == b'connection':
+                keep_alive = value.strip().lower() != b'close'
+
+        if length is None:
+            # Without a length the body is delimited by the server closing
+            # the connection.
+            return status, content_type, rfile.read(), False
+
+        content = rfile.read(length)
+        if len(content) != length:
+            raise ServerConnectionError('server went away')
+        return status, content_type, content, keep_alive
+
+    def _post_many(self, requests):
+        # Pipelined requests are written together, and the responses are read
+        # back in the same order.
+        accum = []
+        for path, body in requests:
+            accum.append((self._request_head % (path, len(body))).encode(
+                'latin-1'))
+            accum.append(body)
+        data = b''.join(accum)
+
+        # Whether the requests may be sent again should the server have run
+        # them, then closed the connection before replying.
+        idempotent = all(path in _IDEMPOTENT for path, _ in requests)
+        generation = self._generation
+
+        conn = self._take_conn()
+        if conn is not None:
+            responses = self._send(conn, data, len(requests), idempotent,
+                                   generation)
+            if responses is not None:
+                return responses
+
+        # Either there was no idle connection, or the server had closed it
+        # (e.g. after its keep-alive timeout) and the requests are safe to
+        # send again.
+        responses = self._send(self._get_conn(), data, len(requests), False,
+                               generation)
+        if responses is None:
+            raise ServerConnectionError('server went away')
+        return responses
+
+    def _send(self, conn, data, n, retry, generation):
+        # Returns None if the requests could not be written, or if "retry" is
+        # set and the connection was closed without any response.
+        sock, rfile = conn
+        responses = []
+        keep_alive = True
+        try:
+            sock.sendall(data)
+        except ConnectionError:
+            self._close_conn(conn)
+            return
 
-    def request(self, path, data, db=None, allowed_status=None, atomic=False,
-                decode_keys=None):
-        if isinstance(data, dict):
-            body = self._encode_keys_values(data)
-        elif isinstance(data, list):
-            body = self._encode_keys(data)
+        try:
+            try:
+                line = rfile.readline(65537)
+            except ConnectionError:
+                line = b''
+            if not line:
+                if retry:
+                    self._close_conn(conn)
+                    return
+                raise ServerConnectionError('server went away')
+
+            while True:
+                status, content_type, content, keep_alive = \
+                        self._read_response(rfile, line)
+                responses.append((status, content_type, content))
+                if len(responses) == n:
+                    break
+                line = rfile.readline(65537)
+                if not line:
+                    raise ServerConnectionError('server went away')
+        except Exception:
+            self._close_conn(conn)
+            raise
+
+        if keep_alive:
+            self._put_conn(conn, generation)
         else:
-            body = data
+            self._close_conn(conn)
+        return responses
 
+    def _post(self, path, body):
+        return self._post_many(((path, body),))[0]
+
+    def _encode_body(self, data, db=None, atomic=False):
         prefix = {}
         if db is not False:
             prefix['DB'] = self.default_db if db is None else db
         if atomic:
             prefix['atomic'] = ''
 
-        if prefix:
-            db_data = self._encode_keys_values(prefix)
-            if body:
-                body = b'\n'.join((db_data, body))
-            else:
-                body = db_data
-
-        try:
-            r = self._post(path, body)
-        except Exception as exc:
-            self.close()
-            raise
-
-        content = r.read()
-        content_type = r.getheader('content-type')
-        status = r.status
+        # Collect the lines of the request body, so that it is assembled with
+        # a single join.
+        accum = self._encode_keys_values(prefix, [])
+        if isinstance(data, dict):
+            self._encode_keys_values(data, accum)
+        elif isinstance(data, list):
+            self._encode_keys(data, accum)
+        elif data:
+            accum.append(data)
+        return b'\n'.join(accum)
 
+    def _handle_response(self, response, allowed_status, decode_keys):
+        status, content_type, content = response
         if status != 200:
             if allowed_status is None or status not in allowed_status:
                 raise ProtocolError('protocol error [%s]' % status)
@@ -150,6 +328,39 @@ class HttpProtocol(object):
         data = self._decode_response(content, content_type, decode_keys)
         return data, status
 
+    def request(self, path, data, db=None, allowed_status=None, atomic=False,
+                decode_keys=None):
+        body = self._encode_body(data, db, atomic)
+        return self._handle_response(self._post(path, body), allowed_status,
+                                     decode_keys)
+
+    def _run(self, command):
+        path, data, db, allowed_status, decode_keys, converter = command
+        resp, status = self.request(path, data, db, allowed_status,
+                                    decode_keys=decode_keys)
+        return converter(resp, status)
+
+    def pipeline(self, commands):
+        """
+        Send a batch of commands as pipelined requests on one connection,
+        reading all of the responses before any of them are checked.
+
+        :param list commands: commands, as returned by the methods ending in
+            "_command", e.g. :py:meth:`add_command`.
+        :return: a list containing the result of each command.
+        """
+        responses = self._post_many([
+            (path, self._encode_body(data, db))
+            for path, data, db, _, _, _ in commands])
+
+        accum = []
+        for command, response in zip(commands, responses):
+            _, _, _, allowed_status, decode_keys, converter = command
+            resp, status = self._handle_response(response, allowed_status,
+                                                 decode_keys)
+            accum.append(converter(resp, status))
+        return accum
+
     def report(self):
         resp, status = self.request('/report', {}, None)
         return resp
@@ -204,54 +415,81 @@ class HttpProtocol(object):
         _, status = self.request('/synchronize', data, db)
         return status == 200
 
-    def _simple_write(self, cmd, key, value, db=None, expire_time=None,
-                      encode_value=True):
+    def _simple_write_command(self, cmd, key, value, db=None,
+                              expire_time=None, encode_value=True):
         if encode_value:
             value = self.encode_value(value)
         data = {'key': key, 'value': value}
         if expire_time is not None:
             data['xt'] = str(expire_time)
-        resp, status = self.request('/%s' % cmd, data, db, (450,))
-        return status != 450
+        return ('/%s' % cmd, data, db, (450,), None, _found)
+
+    def set_command(self, key, value, db=None, expire_time=None,
+                    encode_value=True):
+        return self._simple_write_command('set', key, value, db, expire_time,
+                                          encode_value)
 
     def set(self, key, value, db=None, expire_time=None, encode_value=True):
-        return self._simple_write('set', key, value, db, expire_time,
-                                  encode_value)
+        return self._run(self.set_command(key, value, db, expire_time,
+                                          encode_value))
+
+    def add_command(self, key, value, db=None, expire_time=None,
+                    encode_value=True):
+        return self._simple_write_command('add', key, value, db, expire_time,
+                                          encode_value)
 
     def add(self, key, value, db=None, expire_time=None, encode_value=True):
-        return self._simple_write('add', key, value, db, expire_time,
-                                  encode_value)
+        return self._run(self.add_command(key, value, db, expire_time,
+                                          encode_value))
+
+    def replace_command(self, key, value, db=None, expire_time=None,
+                        encode_value=True):
+        return self._simple_write_command('replace', key, value, db,
+                                          expire_time, encode_value)
 
     def replace(self, key, value, db=None, expire_time=None,
                 encode_value=True):
-        return self._simple_write('replace', key, value, db, expire_time,
-                                  encode_value)
+        return self._run(self.replace_command(key, value, db, expire_time,
+                                              encode_value))
+
+    def append_command(self, key, value, db=None, expire_time=None,
+                       encode_value=True):
+        return self._simple_write_command('append', key, value, db,
+                                          expire_time, encode_value)
 
     def append(self, key, value, db=None, expire_time=None, encode_value=True):
-        return self._simple_write('append', key, value, db, expire_time,
-                                  encode_value)
+        return self._run(self.append_command(key, value, db, expire_time,
+                                             encode_value))
 
-    def increment(self, key, n=1, orig=None, db=None, expire_time=None):
+    def _increment_command(self, cmd, key, n, orig, db, expire_time,
+                           converter):
         data = {'key': key, 'num': str(n)}
         if orig is not None:
             data['orig'] = str(orig)
         if expire_time is not None:
             data['xt'] = str(expire_time)
-        resp, status = self.request('/increment', data, db, decode_keys=False)
-        return int(resp[b'num'])
+        return (cmd, data, db, None, False, converter)
+
+    def increment_command(self, key, n=1, orig=None, db=None,
+                          expire_time=None):
+        return self._increment_command('/increment', key, n, orig, db,
+                                       expire_time, _num_int)
+
+    def increment(self, key, n=1, orig=None, db=None, expire_time=None):
+        return self._run(self.increment_command(key, n, orig, db,
+                                                expire_time))
+
+    def increment_double_command(self, key, n=1, orig=None, db=None,
+                                 expire_time=None):
+        return self._increment_command('/increment_double', key, n, orig, db,
+                                       expire_time, _num_float)
 
     def increment_double(self, key, n=1, orig=None, db=None, expire_time=None):
-        data = {'key': key, 'num': str(n)}
-        if orig is not None:
-            data['orig'] = str(orig)
-        if expire_time is not None:
-            data['xt'] = str(expire_time)
-        resp, status = self.request('/increment_double', data, db,
-                                    decode_keys=False)
-        return float(resp[b'num'])
+        return self._run(self.increment_double_command(key, n, orig, db,
+                                                       expire_time))
 
-    def cas(self, key, old_val, new_val, db=None, expire_time=None,
-            encode_value=True):
+    def cas_command(self, key, old_val, new_val, db=None, expire_time=None,
+                    encode_value=True):
         if old_val is None and new_val is None:
             raise ValueError('old value and/or new value must be specified.')
 
@@ -266,17 +504,20 @@ class HttpProtocol(object):
             data['nval'] = new_val
         if expire_time is not None:
             data['xt'] = str(expire_time)
+        return ('/cas', data, db, (450,), None, _found)
 
-        resp, status = self.request('/cas', data, db, (450,))
-        return status != 450
+    def cas(self, key, old_val, new_val, db=None, expire_time=None,
+            encode_value=True):
+        return self._run(self.cas_command(key, old_val, new_val, db,
+                                          expire_time, encode_value))
+
+    def remove_command(self, key, db=None):
+        return ('/remove', {'key': key}, db, (450,), None, _found)
 
     def remove(self, key, db=None):
-        resp, status = self.request('/remove', {'key': key}, db, (450,))
-        return status != 450
+        return self._run(self.remove_command(key, db))
 
-    def get(self, key, db=None, decode_value=True):
-        resp, status = self.request('/get', {'key': key}, db, (450,),
-                                    decode_keys=False)
+    def _get_value(self, decode_value, resp, status):
         if status == 450:
             return
         value = resp[b'value']
@@ -284,9 +525,18 @@ class HttpProtocol(object):
             value = self.decode_value(value)
         return value
 
+    def get_command(self, key, db=None, decode_value=True):
+        return ('/get', {'key': key}, db, (450,), False,
+                partial(self._get_value, decode_value))
+
+    def get(self, key, db=None, decode_value=True):
+        return self._run(self.get_command(key, db, decode_value))
+
+    def check_command(self, key, db=None):
+        return ('/check', {'key': key}, db, (450,), None, _found)
+
     def check(self, key, db=None):
-        resp, status = self.request('/check', {'key': key}, db, (450,))
-        return status != 450
+        return self._run(self.check_command(key, db))
 
     def length(self, key, db=None):
         resp, status = self.request('/check', {'key': key}, db, (450,),
@@ -525,17 +775,17 @@ class Cursor(object):
         self._valid = self.protocol.cur_step_back(self.cursor_id)
         return self._valid
 
-    def key(self):
+    def key(self, step=False):
         if self._valid:
-            return self.protocol.cur_get_key(self.cursor_id)
+            return self.protocol.cur_get_key(self.cursor_id, step)
 
-    def value(self):
+    def value(self, step=False):
         if self._valid:
-            return self.protocol.cur_get_value(self.cursor_id)
+            return self.protocol.cur_get_value(self.cursor_id, step)
 
-    def get(self):
+    def get(self, step=False):
         if self._valid:
-            return self.protocol.cur_get(self.cursor_id)
+            return self.protocol.cur_get(self.cursor_id, step)
 
     def set_value(self, value):
         if self._valid:
@@ -565,11 +815,10 @@ class Cursor(object):
     def __next__(self):
         if not self._valid:
             raise StopIteration
-        kv = self.protocol.cur_get(self.cursor_id)
+        # Read the current record and advance the cursor in one request.
+        kv = self.protocol.cur_get(self.cursor_id, True)
         if kv is None:
             self._valid = False
             raise StopIteration
-        elif not self.step():
-            self._valid = False
         return kv
     next = __next__
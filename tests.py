@@ -1,5 +1,7 @@
 import functools
 import os
+import socket
+import struct
 import sys
 import threading
 import unittest
@@ -18,7 +20,9 @@ from kt import KT_JSON
 from kt import KT_NONE
 from kt import KT_PICKLE
 from kt import KyotoTycoon
+from kt import ProtocolError
 from kt import QueryBuilder
+from kt import ServerConnectionError
 from kt import TokyoTyrant
 from kt import TT_TABLE
 from kt import constants
@@ -162,6 +166,92 @@ class KyotoTycoonTests(object):
         self.assertTrue(self.db.remove_bulk(['k1'], no_reply=True) is None)
         self.assertTrue(self.db.get('k1') is None)
 
+    def test_pipeline(self):
+        with self.db.pipeline() as p:
+            p.set('k1', 'v1').set_bulk({'k2': 'v2', 'k3': 'v3'})
+            p.get('k1').get('kx').get_bulk(['k1', 'k2', 'kx'])
+            p.remove('k1').remove_bulk(['k1', 'k2', 'kx'])
+            self.assertEqual(len(p), 7)
+            self.assertEqual(p.execute(), [
+                1,
+                2,
+                'v1',
+                None,
+                {'k1': 'v1', 'k2': 'v2'},
+                1,
+                1])
+            self.assertEqual(len(p), 0)
+            p.set('k4', 'v4')
+
+        # Remaining commands are sent when the context manager exits.
+        self.assertEqual(self.db.get_bulk(['k1', 'k2', 'k3', 'k4']), {
+            'k3': 'v3', 'k4': 'v4'})
+
+        # Commands are flushed automatically when the depth is reached.
+        p = self.db.pipeline(depth=4)
+        for i in range(10):
+            p.set('k%02d' % i, 'v%02d' % i)
+        self.assertEqual(len(p), 2)
+        self.assertEqual(self.db.get('k07'), 'v07')
+        self.assertTrue(self.db.get('k08') is None)
+        p.get('k09')
+        self.assertEqual(p.execute(), [1] * 10 + ['v09'])
+
+    def test_pipeline_merge(self):
+        # Runs of single-key sets and gets are sent as bulk commands, but
+        # still return one result per command.
+        with self.db.pipeline() as p:
+            p.set('k1', 'v1').set('k2', 'v2').set('k1', 'v1-x')
+            p.set('k3', 'v3', db=1)
+            p.get('k1').get('kx').get('k2').get('k1')
+            p.get('k3').get('k3', db=1)
+            p.remove('k2')
+            p.get('k2').get('k1')
+            self.assertEqual(p.execute(), [
+                1, 1, 1,
+                1,
+                'v1-x', None, 'v2', 'v1-x',
+                None, 'v3',
+                1,
+                None, 'v1-x'])
+
+        self.assertEqual(self.db.get_bulk(['k1', 'k2', 'k3']), {'k1': 'v1-x'})
+        self.assertEqual(self.db.remove('k3', db=1), 1)
+
+    def test_pipeline_bytes(self):
+        # Raw and serialized commands are never merged with one another.
+        with self.db.pipeline() as p:
+            p.set_bytes('k1', b'v1').set_bytes('k2', b'v2').set('k3', 'v3')
+            p.get_bytes('k1').get_bytes('k2').get('k1').get('k3')
+            self.assertEqual(p.execute(), [
+                1, 1, 1,
+                b'v1', b'v2', 'v1', 'v3'])
+
+    def test_http_pipeline(self):
+        with self.db.http_pipeline() as p:
+            p.add('k1', 'v1').add('k1', 'v1-x').replace('k2', 'v2')
+            p.append('k1', '-y').cas('k1', 'v1-y', 'v1-z')
+            p.incr('n').incr('n', 2).incr_double('f', 1.5)
+            p.exists('k1').exists('k2').get('k1').remove('k1').get('k1')
+            self.assertEqual(len(p), 13)
+            self.assertEqual(p.execute(), [
+                True, False, False,
+                True, True,
+                1, 3, 1.5,
+                True, False, 'v1-z', True, None])
+            p.set('k3', 'v3')
+
+        # Remaining commands are sent when the context manager exits.
+        self.assertEqual(self.db.get('k3'), 'v3')
+
+        # Commands are flushed automatically when the depth is reached.
+        p = self.db.http_pipeline(depth=3)
+        for i in range(4):
+            p.incr('c')
+        self.assertEqual(len(p), 1)
+        self.assertEqual(self.db.incr('c', 0), 3)
+        self.assertEqual(p.execute(), [1, 2, 3, 4])
+
     def test_get_bytes(self):
         self.db['k1'] = b'v1'
         self.db['k2'] = b'\xff\x00\xff'
@@ -177,6 +267,37 @@ class KyotoTycoonTests(object):
         del self.db['key']
         self.assertEqual(len(self.db), 0)
 
+    def test_bulk_mixed_value_sizes(self):
+        # Mix small values with values large enough to be sent as separate
+        # buffers, so the request is split across many parts.
+        data = {}
+        for i in range(1200):
+            data['k%04d' % i] = ('%s' % (i % 10)) * (64 * 1024 if i % 3 else 8)
+        self.assertEqual(self.db.set_bulk(data), 1200)
+        self.assertEqual(self.db.get_bulk(list(data)), data)
+
+        self.db['k0001'] = 'small'
+        self.db['k0002'] = 'b' * (1024 * 1024)
+        self.assertEqual(self.db['k0001'], 'small')
+        self.assertEqual(self.db['k0002'], 'b' * (1024 * 1024))
+
+    def test_set_bulk_lists(self):
+        self.assertEqual(self.db.set_bulk_lists(['k1', 'k2'], ['v1', 'v2']), 2)
+        self.assertEqual(self.db.set_bulk_lists(['k3'], ['v3'], db=1), 1)
+        self.assertEqual(self.db.get_bulk(['k1', 'k2', 'k3']), {
+            'k1': 'v1', 'k2': 'v2'})
+        self.assertEqual(self.db.get('k3', db=1), 'v3')
+        self.assertRaises(ValueError, self.db.set_bulk_lists, ['k1'], [])
+        self.assertEqual(self.db.remove('k3', db=1), 1)
+
+    def test_set_bulk_array(self):
+        values = memoryview(b'aaaabbbbcccc').cast('B', (3, 4))
+        self.assertEqual(self.db.set_bulk_array(['k1', 'k2', 'k3'], values), 3)
+        self.assertEqual(self.db.get_bulk(['k1', 'k2', 'k3'],
+                                          decode_values=False),
+                         {'k1': b'aaaa', 'k2': b'bbbb', 'k3': b'cccc'})
+        self.assertRaises(ValueError, self.db.set_bulk_array, ['k1'], values)
+
     def test_protocol_binary(self):
         self._test_protocol(self.db._protocol)
 
@@ -467,6 +588,9 @@ class TestKyotoTycoonScripting(BaseTestCase):
         # Test get cardinality.
         self.assertEqual(L.scard(key='s1'), {'num': '4'})
 
+        # Script callables are cached on the runner.
+        self.assertTrue(L.scard is L.scard)
+
         # Test membership.
         self.assertEqual(L.sismember(key='s1', value='bar'), {'num': '1'})
         self.assertEqual(L.sismember(key='s1', value='baze'), {'num': '0'})
@@ -516,6 +640,33 @@ class TestKyotoTycoonScripting(BaseTestCase):
         res = L.smembers(key='s3')
         self.assertEqual(res, {'bar': '1', 'baz': '1'})
 
+    def test_pipeline_script(self):
+        with self.db.pipeline() as p:
+            p.script('sadd', {'key': 's1', 'value': 'foo'})
+            p.set('k1', 'v1')
+            p.script('sadd', {'key': 's1', 'value': 'bar'})
+            p.script('scard', {'key': 's1'})
+            p.get('k1')
+            self.assertEqual(p.execute(), [
+                {'num': '1'},
+                1,
+                {'num': '1'},
+                {'num': '2'},
+                'v1'])
+
+    def test_pipeline_error(self):
+        p = self.db.pipeline(depth=2)
+        p.set('k1', 'v1').set('k2', 'v2')
+        self.assertEqual(len(p), 0)
+
+        # The failed batch discards the results of earlier batches as well.
+        p.set('k3', 'v3')
+        self.assertRaises(ProtocolError, p.script, 'missing_script')
+        self.assertEqual(p.execute(), [])
+
+        p.set('k4', 'v4').get('k1')
+        self.assertEqual(p.execute(), [1, 'v1'])
+
     def test_script_list(self):
         L = self.db.lua
 
@@ -1032,6 +1183,45 @@ class TestKyotoTycoonMultiDatabase(BaseTestCase):
             'k2': b'v2-1',
             'k3': b'v3-1'})
 
+    def test_set_database(self):
+        db = KyotoTycoon(self._server._host, self._server._port)
+        db.set('k1', 'v1-0')
+        self.assertTrue(db.set_database(1) is db)
+        self.assertEqual(db._default_db, 1)
+
+        # Binary and HTTP commands both use the new default database.
+        db.set('k1', 'v1-1')
+        self.assertEqual(db.get('k1'), 'v1-1')
+        self.assertEqual(len(db), 1)
+        self.assertTrue(db.add('k2', 'v2-1'))
+        self.assertEqual(self.db.get_bulk(['k1', 'k2'], db=0), {'k1': 'v1-0'})
+        self.assertEqual(self.db.get_bulk(['k1', 'k2'], db=1), {
+            'k1': 'v1-1', 'k2': 'v2-1'})
+
+    def test_status_ttl(self):
+        db = KyotoTycoon(self._server._host, self._server._port,
+                         status_ttl=60)
+        db.set('k1', 'v1')
+        self.assertEqual(len(db), 1)
+
+        # Status is cached per database until the ttl expires.
+        db.set('k2', 'v2')
+        self.assertEqual(len(db), 1)
+        self.assertEqual(db.count(1), 0)
+        self.assertEqual(len(self.db), 2)
+
+        db._status_cache.clear()
+        self.assertEqual(len(db), 2)
+
+        # Callers get their own copy of the cached status.
+        status = db.status()
+        status.pop('count')
+        self.assertEqual(int(db.status()['count']), 2)
+
+        # Clearing the database invalidates the cached status.
+        db.clear()
+        self.assertEqual(len(db), 0)
+
     def test_multiple_databases(self):
         k0 = KyotoTycoon(self._server._host, self._server._port, default_db=0)
         k1 = KyotoTycoon(self._server._host, self._server._port, default_db=1)
@@ -1196,6 +1386,28 @@ class TestMultipleThreads(BaseTestCase):
             t.start()
         [t.join() for t in threads]
 
+    def test_multiple_threads_http(self):
+        self.db.update(dict(('k%s' % i, 'v%s' % i) for i in range(100)))
+        errors = []
+
+        def check(s):
+            try:
+                for i in range(s, s + 10):
+                    # exists() and length() are served over HTTP.
+                    self.assertTrue(self.db.exists('k%s' % i))
+                    self.assertEqual(self.db.length('k%s' % i),
+                                     len('v%s' % i))
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=check, args=(10 * i,))
+                   for i in range(10)]
+        for t in threads:
+            t.daemon = True
+            t.start()
+        [t.join() for t in threads]
+        self.assertEqual(errors, [])
+
 
 class TestConnectionPool(BaseTestCase):
     server = EmbeddedServer
@@ -1251,6 +1463,13 @@ class TestConnectionPool(BaseTestCase):
         t = threading.Thread(target=in_another_thread)
         t.start() ; t.join()
 
+        # The most recently used connection is reused first.
+        conn = p._state.conn
+        self.assertTrue(p.close())
+        self.assertTrue(p.connect())
+        self.assertTrue(p._state.conn is conn)
+        self.assertEqual(stats(), (1, 1))
+
         self.assertTrue(p.close())
         self.assertEqual(stats(), (0, 2))
 
@@ -1258,6 +1477,24 @@ class TestConnectionPool(BaseTestCase):
         self.assertEqual(stats(), (0, 0))
 
 
+class TestEmbeddedServer(BaseTestCase):
+    server = EmbeddedServer
+    server_kwargs = {'database': '*'}
+
+    def test_reset(self):
+        port, pid = self._server._port, self._server.pid
+        self.db.set('k1', 'v1')
+
+        # Resetting restarts the server on the same port with an empty db.
+        db = type(self).db = self._server.reset()
+        self.assertEqual(self._server._port, port)
+        self.assertTrue(self._server.pid != pid)
+        self.assertTrue(db.get('k1') is None)
+
+        db.set('k1', 'v2')
+        self.assertEqual(db.get('k1'), 'v2')
+
+
 class TestArrayMapSerialization(unittest.TestCase):
     def setUp(self):
         db = KyotoTycoon()
@@ -1326,6 +1563,39 @@ class TestArrayMapSerialization(unittest.TestCase):
         self.assertEqual(deserialize(b''), [])
 
 
+class TestTruncatedResponse(unittest.TestCase):
+    def setUp(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(1)
+
+    def tearDown(self):
+        self.listener.close()
+
+    def serve_truncated_get_bulk(self, key, vlen):
+        # Answer a single get_bulk with a record header promising "vlen" bytes
+        # of value, send only half of them, then drop the connection.
+        conn, _ = self.listener.accept()
+        try:
+            conn.recv(1024)
+            conn.sendall(b'\xba' + struct.pack('>I', 1) +
+                         struct.pack('>HIIq', 0, len(key), vlen, -1) + key +
+                         b'x' * (vlen // 2))
+        finally:
+            conn.close()
+
+    def test_truncated_large_response(self):
+        vlen = 3 * 1024 * 1024
+        t = threading.Thread(target=self.serve_truncated_get_bulk,
+                             args=(b'k1', vlen))
+        t.daemon = True
+        t.start()
+
+        db = KyotoTycoon(port=self.listener.getsockname()[1])
+        self.assertRaises(ServerConnectionError, db.get_bulk, ['k1'])
+        t.join()
+        db.close()
+
 class TokyoTyrantTests(object):
     def test_basic_operations(self):
         self.assertEqual(len(self.db), 0)
@@ -1912,6 +2182,13 @@ class TestTokyoTyrantSearch(BaseTestCase):
                  .offset(1))
         self.assertEqual(query.execute(self.db), ['mickey', 'leslie', 'huey'])
 
+        # Queries can be re-executed, and modifying a query leaves the
+        # original unchanged.
+        self.assertEqual(query.execute(self.db), ['mickey', 'leslie', 'huey'])
+        self.assertEqual(query.offset(3).execute(self.db),
+                         ['huey', 'connor', 'charlie'])
+        self.assertEqual(query.execute(self.db), ['mickey', 'leslie', 'huey'])
+
     def test_search_get(self):
         query = (QueryBuilder()
                  .filter('type', constants.OP_STR_EQ, 'cat')
@@ -1922,6 +2199,14 @@ class TestTokyoTyrantSearch(BaseTestCase):
             ('huey', {'name': 'huey', 'type': 'cat', 'age': '7',
                       'eyes': 'blue'})])
 
+    def test_search_none_value(self):
+        # None is sent as the string "None" rather than raising an error.
+        query = QueryBuilder().filter('name', constants.OP_STR_EQ, None)
+        self.assertEqual(query.execute(self.db), [])
+
+        self.db['None'] = {'name': 'None', 'type': 'placeholder'}
+        self.assertEqual(query.execute(self.db), ['None'])
+
     def test_indexing(self):
         self.assertTrue(self.db.set_index('name', constants.INDEX_STR))
         self.assertTrue(self.db.set_index('age', constants.INDEX_NUM))